@@ -1,11 +1,20 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import create_react_agent
 from langsmith import traceable
+import asyncio
 import os
+from typing import AsyncIterator, List, Tuple, TypedDict
 from dotenv import load_dotenv
-from bson import ObjectId
+from utils.assignment_store import get_assignment_store
+from utils import catalog, memory
+from utils.llm_cache import cache_key, cached_completion
+from utils.rate_limit import limiter
+from utils.relevance import get_goal_profile, top_candidates
 
 # Load environment variables
 load_dotenv()
@@ -47,235 +56,346 @@ async def handle_agent_name_update(db, user_id: str, message: str) -> str:
         return "Hello! How can I help you today?"
 
 
-def get_learning_agent(db):
-    """
-    Initialize and return the learning agent.
-    This function exists for compatibility with your existing code.
-    
-    Returns a simple object that can be invoked.
-    """
-    print("✅ Learning agent initialized")
-    
-    # Return a simple callable that wraps run_learning_agent
-    class SimpleLearningAgent:
-        def __init__(self, database):
-            self.db = database
-        
-        async def ainvoke(self, user_id: str, message: str = None):
-            """Invoke the agent for a specific user."""
-            return await run_learning_agent(self.db, user_id, message)
-    
-    return SimpleLearningAgent(db)
+def _db(config: RunnableConfig):
+    """Database handle passed per invocation via config["configurable"]["db"]."""
+    return config["configurable"]["db"]
 
 
-@traceable(name="Learning Agent", tags=["agent", "career-guidance"])
-async def run_learning_agent(db, user_id: str, user_message: str = None) -> dict:
-    """
-    Agentic learning assistant that:
-    1. Answers career and growth questions conversationally
-    2. Provides personalized task recommendations based on goals
-    3. Handles general career guidance queries
-    
-    Args:
-        db: Database connection
-        user_id: User identifier
-        user_message: Optional message from user. If "Updated the goals. Share the revised tasks.", 
-                     triggers task assignment mode. Otherwise, conversational mode.
-    """
+async def fetch_user_goals(db, user_id: str) -> dict:
+    """Learning goals for a user, normalized to a list of strings."""
     try:
-        print(f"\n{'='*60}")
-        print(f"🚀 Starting learning agent for user: {user_id}")
-        print(f"📝 User message: {user_message}")
-        print(f"{'='*60}\n")
+        print(f"🔍 Fetching goals for user: {user_id}")
+        goals_doc = await db.goals.find_one({"userId": user_id})
+        if not goals_doc:
+            return {"goals": [], "message": "No goals set"}
         
-        # Get agent name for personalized responses
-        agent_doc = await db.agents.find_one({"userId": user_id})
-        agent_name = agent_doc.get("agentName", "Study Buddy") if agent_doc else "Study Buddy"
-        print(f"🤖 Agent name: {agent_name}")
+        goals_data = goals_doc.get("goals", [])
+        print(f"   Raw goals_data type: {type(goals_data)}")
+        print(f"   Raw goals_data: {goals_data}")
         
-        # Initialize LLM
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found")
+        # Robust parsing - handle any data type
+        goals = []
         
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
-            temperature=0.7,
-            google_api_key=api_key
-        )
+        if isinstance(goals_data, list):
+            for item in goals_data:
+                if item:
+                    item_str = str(item).strip()
+                    if item_str:
+                        goals.append(item_str)
         
-        print("✅ LLM initialized")
+        elif isinstance(goals_data, str):
+            stripped = goals_data.strip()
+            if stripped:
+                goals.append(stripped)
         
-        # Define tools
-        @tool
-        async def get_user_goals(user_id: str) -> dict:
-            """Fetch the learning goals for a specific user."""
-            try:
-                print(f"🔍 Fetching goals for user: {user_id}")
-                goals_doc = await db.goals.find_one({"userId": user_id})
-                if not goals_doc:
-                    return {"goals": [], "message": "No goals set"}
-                
-                goals_data = goals_doc.get("goals", [])
-                print(f"   Raw goals_data type: {type(goals_data)}")
-                print(f"   Raw goals_data: {goals_data}")
-                
-                # Robust parsing - handle any data type
-                goals = []
-                
-                if isinstance(goals_data, list):
-                    for item in goals_data:
-                        if item:
-                            item_str = str(item).strip()
-                            if item_str:
-                                goals.append(item_str)
-                
-                elif isinstance(goals_data, str):
-                    stripped = goals_data.strip()
-                    if stripped:
-                        goals.append(stripped)
-                
-                elif goals_data:
-                    goals.append(str(goals_data))
-                
-                print(f"✅ Parsed {len(goals)} goal(s): {goals}")
-                return {"goals": goals}
-                
-            except Exception as e:
-                print(f"❌ Error in get_user_goals: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                return {"error": str(e)}
+        elif goals_data:
+            goals.append(str(goals_data))
         
-        @tool
-        async def get_project_details(project_id: str) -> dict:
-            """Fetch project details including name, description, and status."""
-            try:
-                print(f"🔍 Fetching project: {project_id}")
-                project = await db.projects.find_one({"_id": ObjectId(project_id)})
-                if not project:
-                    return {"error": f"Project {project_id} not found"}
-                
-                result = {
-                    "id": str(project["_id"]),
-                    "name": project.get("name"),
-                    "description": project.get("description", "No description"),
-                    "status": project.get("status")
-                }
-                print(f"✅ Project found: {result['name']}")
-                return result
-            except Exception as e:
-                print(f"❌ Error: {str(e)}")
-                return {"error": str(e)}
+        print(f"✅ Parsed {len(goals)} goal(s): {goals}")
+        return {"goals": goals}
         
-        @tool
-        async def get_project_tasks(project_id: str) -> list:
-            """Fetch all tasks for a specific project."""
-            try:
-                print(f"🔍 Fetching tasks for project: {project_id}")
-                tasks_cursor = db.tasks.find({"project_id": project_id})
-                tasks = await tasks_cursor.to_list(length=None)
-                
-                result = [
-                    {
-                        "id": str(task["_id"]),
-                        "title": task.get("title"),
-                        "description": task.get("description", "No description"),
-                        "status": task.get("status")
-                    }
-                    for task in tasks
-                ]
-                print(f"✅ Found {len(result)} tasks")
-                return result
-            except Exception as e:
-                print(f"❌ Error: {str(e)}")
-                return [{"error": str(e)}]
+    except Exception as e:
+        print(f"❌ Error in get_user_goals: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {"error": str(e)}
+
+
+async def fetch_project_details(db, project_id: str) -> dict:
+    """Project name, description and status."""
+    try:
+        print(f"🔍 Fetching project: {project_id}")
+        project = await catalog.get_project(db, project_id)
+        if not project:
+            return {"error": f"Project {project_id} not found"}
         
-        @tool
-        async def get_user_assigned_tasks(user_id: str) -> dict:
-            """Fetch all tasks already assigned to the user (both completed and pending)."""
-            try:
-                print(f"🔍 Fetching assigned tasks for user: {user_id}")
-                assignment = await db.assignments.find_one({"userId": user_id})
-                
-                if not assignment or not assignment.get("tasks"):
-                    print("✅ No tasks assigned to user yet")
-                    return {"assigned_task_ids": [], "completed_task_ids": []}
-                
-                assigned_task_ids = []
-                completed_task_ids = []
-                
-                for task in assignment.get("tasks", []):
-                    task_id = task.get("taskId")
-                    if task_id:
-                        assigned_task_ids.append(task_id)
-                        if task.get("isCompleted", False):
-                            completed_task_ids.append(task_id)
-                
-                print(f"✅ User has {len(assigned_task_ids)} assigned tasks ({len(completed_task_ids)} completed)")
-                return {
-                    "assigned_task_ids": assigned_task_ids,
-                    "completed_task_ids": completed_task_ids
-                }
-            except Exception as e:
-                print(f"❌ Error: {str(e)}")
-                return {"error": str(e), "assigned_task_ids": [], "completed_task_ids": []}
+        result = {
+            "id": project["id"],
+            "name": project.get("name"),
+            "description": project.get("description", "No description"),
+            "status": project.get("status")
+        }
+        print(f"✅ Project found: {result['name']}")
+        return result
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return {"error": str(e)}
+
+
+async def fetch_user_assigned_tasks(db, user_id: str) -> dict:
+    """IDs of the tasks already assigned to the user (both completed and pending)."""
+    try:
+        print(f"🔍 Fetching assigned tasks for user: {user_id}")
+        task_assignments = await get_assignment_store(db).list_tasks(user_id)
         
-        # Determine mode based on user message
-        is_task_assignment_mode = (
-            user_message and 
-            ("updated the goals" in user_message.lower() or 
-             "share the revised tasks" in user_message.lower() or
-             "share tasks" in user_message.lower())
-        )
+        if not task_assignments:
+            print("✅ No tasks assigned to user yet")
+            return {"assigned_task_ids": [], "completed_task_ids": []}
         
-        if is_task_assignment_mode:
-            print("🎯 MODE: Task Assignment")
-            tools = [get_user_goals, get_project_details, get_project_tasks, get_user_assigned_tasks]
-            
-            system_prompt = f"""You are {agent_name}, an expert learning path advisor.
+        assigned_task_ids = []
+        completed_task_ids = []
+        
+        for task in task_assignments:
+            task_id = task.get("taskId")
+            if task_id:
+                assigned_task_ids.append(task_id)
+                if task.get("isCompleted", False):
+                    completed_task_ids.append(task_id)
+        
+        print(f"✅ User has {len(assigned_task_ids)} assigned tasks ({len(completed_task_ids)} completed)")
+        return {
+            "assigned_task_ids": assigned_task_ids,
+            "completed_task_ids": completed_task_ids
+        }
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return {"error": str(e), "assigned_task_ids": [], "completed_task_ids": []}
+
+
+@tool
+async def get_user_goals(user_id: str, config: RunnableConfig) -> dict:
+    """Fetch the learning goals for a specific user."""
+    return await fetch_user_goals(_db(config), user_id)
+
+
+CONVERSATIONAL_TOOLS = [get_user_goals]
+
+# Task assignment always draws from this project
+LEARNING_PROJECT_ID = "695caa41c485455f397017ae"
+RECOMMENDED_TASK_COUNT = 6
+
+
+class RateLimitCallback(AsyncCallbackHandler):
+    """
+    Waits for a rate limiter token as each model call of a run starts, so
+    a ReAct loop is charged for every call it makes (utils/rate_limit.py).
+    """
+    # Awaited before the call proceeds; errors (e.g. cancellation) propagate
+    run_inline = True
+    raise_error = True
+
+    def __init__(self, db, user_id: str):
+        self.db = db
+        self.user_id = user_id
+
+    async def on_chat_model_start(self, serialized, messages, **kwargs):
+        await limiter.acquire(self.db, self.user_id)
+
+
+def _run_config(db, user_id: str) -> dict:
+    """Invocation config: nodes and tools read the db from it, model calls are rate limited."""
+    return {
+        "configurable": {"db": db, "user_id": user_id},
+        "callbacks": [RateLimitCallback(db, user_id)]
+    }
+
+
+class TaskAssignmentState(TypedDict, total=False):
+    user_id: str
+    agent_name: str
+    goals: List[str]
+    project: dict
+    candidates: List[dict]
+    messages: list
+
+
+async def prefetch_node(state: TaskAssignmentState, config: RunnableConfig) -> dict:
+    """
+    Load goals, assignments and the project concurrently, then keep only the
+    unassigned tasks most relevant to the goals (see utils/relevance.py), so
+    the prompt stays the same size however large the project grows.
+    """
+    db = _db(config)
+    profile, assigned, project = await asyncio.gather(
+        get_goal_profile(db, state["user_id"]),
+        fetch_user_assigned_tasks(db, state["user_id"]),
+        fetch_project_details(db, LEARNING_PROJECT_ID),
+    )
+    top_ids = await top_candidates(
+        db, LEARNING_PROJECT_ID, profile["terms"], exclude=assigned.get("assigned_task_ids", [])
+    )
+    tasks_by_id = await catalog.get_tasks_by_ids(db, top_ids)
+    candidates = [
+        {"id": task_id, "title": tasks_by_id[task_id].get("title"),
+         "description": tasks_by_id[task_id].get("description")}
+        for task_id in top_ids if task_id in tasks_by_id
+    ]
+    print(f"✅ Prefetched {len(candidates)} relevant unassigned task(s)")
+    return {"goals": profile["goals"], "project": project, "candidates": candidates}
+
+
+def _rank_prompts(state: TaskAssignmentState) -> Tuple[str, str]:
+    count = min(RECOMMENDED_TASK_COUNT, len(state["candidates"]))
+    system_prompt = f"""You are {state["agent_name"]}, an expert learning path advisor.
 
 Your task:
-1. Use get_user_goals to fetch the user's learning goals
-2. Use get_user_assigned_tasks to fetch tasks already assigned to the user
-3. Use get_project_details for project_id: "695caa41c485455f397017ae"
-4. Use get_project_tasks to fetch ALL tasks from the project
-5. Filter OUT any tasks whose ID appears in the assigned_task_ids list
-6. From the remaining UNASSIGNED tasks, select exactly 6 tasks
-7. Analyze user goals vs the unassigned tasks (title + description)
-8. Select tasks in progressive order (foundation → intermediate → advanced)
+1. Compare the user's learning goals with the candidate tasks (title + description)
+2. Select exactly {count} tasks that best match the goals
+3. Order them progressively (foundation → intermediate → advanced)
 
 CRITICAL RULES:
-- NEVER recommend tasks that are already in assigned_task_ids
-- ONLY suggest tasks from the project that the user has NOT been assigned yet
-- Select exactly 6 NEW tasks that match user's goals
-- Ensure logical learning progression
+- ONLY choose from the candidate tasks listed; every one is unassigned
+- Copy each task title exactly as written
 
 RESPONSE FORMAT - Return ONLY task titles as a numbered list:
 1. [Task Title 1]
 2. [Task Title 2]
-3. [Task Title 3]
-4. [Task Title 4]
-5. [Task Title 5]
-6. [Task Title 6]
+...
 
-No explanations, just the numbered list of NEW tasks."""
+No explanations, just the numbered list."""
 
-            user_prompt = f"""User ID: {user_id}
+    goals = "\n".join(f"- {goal}" for goal in state["goals"]) or "- No goals set; pick a broad foundational path"
+    project = state.get("project") or {}
+    candidates = "\n".join(
+        f"- {task['title']}: {task.get('description') or 'No description'}"
+        for task in state["candidates"]
+    )
+    user_prompt = f"""My learning goals:
+{goals}
 
-Create my personalized learning path with NEW tasks only:
-1. Fetch my learning goals
-2. Fetch my already assigned tasks (to exclude them)
-3. Fetch project and all tasks
-4. Filter out any tasks I already have assigned
-5. From remaining tasks, select 6 that match my goals in learning order
-6. Return ONLY the numbered list of task titles"""
-            
-        else:
-            print("💬 MODE: Conversational Career Guidance")
-            tools = [get_user_goals]
-            
-            system_prompt = f"""You are {agent_name}, a friendly and knowledgeable career advisor specializing in AI/ML, Data Science, and tech careers.
+Project: {project.get("name", "Learning project")}
+
+Candidate tasks:
+{candidates}"""
+    return system_prompt, user_prompt
+
+
+async def rank_node(state: TaskAssignmentState, config: RunnableConfig) -> dict:
+    """
+    The only model call in task assignment: rank the prefetched candidates.
+    Replies are cached by prompt (utils/llm_cache.py), so asking again with
+    the same goals, assignments and catalog skips the model (and the rate
+    limiter, which RateLimitCallback applies to actual calls only).
+    """
+    system_prompt, user_prompt = _rank_prompts(state)
+    messages = [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+    llm = get_llm()
+
+    async def generate() -> str:
+        return _message_text(await llm.ainvoke(messages, config))
+
+    key = cache_key("task_assignment", llm.model, system_prompt, user_prompt)
+    text = await cached_completion(_db(config), key, generate)
+    return {"messages": messages + [AIMessage(content=text)]}
+
+
+async def no_candidates_node(state: TaskAssignmentState) -> dict:
+    return {"messages": [AIMessage(
+        content="You already have every task from this project assigned. "
+                "Finish those first, and I'll share new ones as they are added!"
+    )]}
+
+
+def build_task_assignment_graph():
+    workflow = StateGraph(TaskAssignmentState)
+    workflow.add_node("prefetch", prefetch_node)
+    workflow.add_node("rank", rank_node)
+    workflow.add_node("no_candidates", no_candidates_node)
+    workflow.set_entry_point("prefetch")
+    workflow.add_conditional_edges(
+        "prefetch",
+        lambda state: "rank" if state["candidates"] else "no_candidates",
+        {"rank": "rank", "no_candidates": "no_candidates"}
+    )
+    workflow.add_edge("rank", END)
+    workflow.add_edge("no_candidates", END)
+    return workflow.compile()
+
+# Built once per process by get_agent_graphs(); the LLM client and the
+# compiled graphs hold no per-request state, so concurrent requests share them
+_llm = None
+_graphs = {}
+
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found")
+        _llm = ChatGoogleGenerativeAI(
+            model="gemini-2.0-flash-exp",
+            temperature=0.7,
+            google_api_key=api_key
+        )
+        print("✅ LLM initialized")
+    return _llm
+
+
+def get_agent_graphs() -> dict:
+    """
+    Compiled graphs for both modes: "task_assignment" (prefetch, then one
+    ranking call) and "conversational" (ReAct with the goals tool).
+    """
+    if not _graphs:
+        llm = get_llm()
+        _graphs["task_assignment"] = build_task_assignment_graph()
+        _graphs["conversational"] = create_react_agent(llm, CONVERSATIONAL_TOOLS)
+        print("✅ Agent graphs compiled")
+    return _graphs
+
+
+def warm_up_agent() -> bool:
+    """Build the LLM client and graphs ahead of the first request."""
+    try:
+        get_agent_graphs()
+        return True
+    except Exception as e:
+        # Requests will retry and report the error themselves
+        print(f"⚠️ Agent warm-up failed: {str(e)}")
+        return False
+
+
+class SimpleLearningAgent:
+    def __init__(self, database):
+        self.db = database
+    
+    async def ainvoke(self, user_id: str, message: str = None):
+        """Invoke the agent for a specific user."""
+        return await run_learning_agent(self.db, user_id, message)
+
+
+def get_learning_agent(db):
+    """
+    Initialize and return the learning agent.
+    This function exists for compatibility with your existing code.
+    
+    Warms up the shared LLM client and graphs, and returns a simple object
+    that can be invoked.
+    """
+    warm_up_agent()
+    print("✅ Learning agent initialized")
+    return SimpleLearningAgent(db)
+
+
+def detect_mode(user_message: str = None) -> str:
+    """Mode for a message: task_assignment when it asks for (revised) tasks, else conversational."""
+    message = (user_message or "").lower()
+    if ("updated the goals" in message or
+            "share the revised tasks" in message or
+            "share tasks" in message):
+        return "task_assignment"
+    return "conversational"
+
+
+async def _prepare_run(db, user_id: str, user_message: str = None) -> Tuple[str, dict]:
+    """Pick the mode for a message and build the input for its graph."""
+    # Get agent name for personalized responses
+    agent_doc = await db.agents.find_one({"userId": user_id})
+    agent_name = agent_doc.get("agentName", "Study Buddy") if agent_doc else "Study Buddy"
+    print(f"🤖 Agent name: {agent_name}")
+    
+    mode = detect_mode(user_message)
+    
+    if mode == "task_assignment":
+        print("🎯 MODE: Task Assignment")
+        # Data is prefetched in code; the model only ranks candidates
+        graph_input = {"user_id": user_id, "agent_name": agent_name}
+        
+    else:
+        print("💬 MODE: Conversational Career Guidance")
+        
+        system_prompt = f"""You are {agent_name}, a friendly and knowledgeable career advisor specializing in AI/ML, Data Science, and tech careers.
 
 YOUR EXPERTISE:
 - Career roadmaps (AI/ML, Data Science, Software Engineering)
@@ -309,53 +429,118 @@ IMPORTANT:
 - Keep responses concise (2-3 paragraphs max)
 - End with a follow-up question to continue the conversation"""
 
-            if user_message:
-                user_prompt = f"""User message: {user_message}
+        if user_message:
+            user_prompt = f"""User message: {user_message}
 
 User ID: {user_id}
 
 Please respond to the user's question. First, fetch their learning goals to provide personalized advice."""
-            else:
-                user_prompt = f"""User ID: {user_id}
+        else:
+            user_prompt = f"""User ID: {user_id}
 
 The user has just updated their goals. Fetch their goals and provide an encouraging welcome message about their learning journey."""
         
-        print("🤖 Creating LangGraph ReAct agent...\n")
-        
-        # Create the ReAct agent
-        agent = create_react_agent(llm, tools)
-        
-        print("✅ Agent created\n")
-        print("📄 Running agent...\n")
+        # Earlier conversation: rolling summary plus the latest turns, within a token budget
+        history = await memory.load(db, user_id)
+        if history["summary"]:
+            system_prompt += f"""
+
+EARLIER CONVERSATION WITH THIS USER (summary):
+{history["summary"]}"""
+        past_turns = []
+        for turn in history["turns"]:
+            past_turns += [HumanMessage(content=turn["user"]), AIMessage(content=turn["agent"])]
         
-        # Run the agent
-        result = await agent.ainvoke({
+        graph_input = {
             "messages": [
                 SystemMessage(content=system_prompt),
+                *past_turns,
                 HumanMessage(content=user_prompt)
             ]
-        })
+        }
+    
+    return mode, graph_input
+
+
+async def _remember(db, user_id: str, mode: str, user_message: str, reply: str):
+    """Add a conversational exchange to the user's memory (utils/memory.py)."""
+    if mode != "conversational" or not user_message:
+        return
+
+    async def summarize(summary: str, turns: List[dict]) -> str:
+        transcript = "\n".join(f"User: {turn['user']}\nAssistant: {turn['agent']}" for turn in turns)
+        prompt = f"""Update the summary of a career-guidance conversation with the exchanges below.
+Keep the user's background, goals, decisions, preferences and open questions; drop greetings and repetition.
+Reply with the updated summary only, at most 150 words.
+
+Current summary:
+{summary or "(none yet)"}
+
+New exchanges:
+{transcript}"""
+        await limiter.acquire(db, user_id)
+        return _message_text(await get_llm().ainvoke([HumanMessage(content=prompt)]))
+
+    try:
+        await memory.record_turn(db, user_id, user_message, reply, summarize)
+    except Exception as e:
+        print(f"⚠️ Could not update conversation memory: {e}")
+
+
+def _message_text(message) -> str:
+    """Plain text of a model message; Gemini may return a list of content parts."""
+    content = message.content if hasattr(message, 'content') else str(message)
+    if isinstance(content, list):
+        content_parts = []
+        for part in content:
+            if isinstance(part, str):
+                content_parts.append(part)
+            elif isinstance(part, dict):
+                content_parts.append(part.get("text", ""))
+            elif hasattr(part, 'text'):
+                content_parts.append(part.text)
+            else:
+                content_parts.append(str(part))
+        content = ''.join(content_parts).strip()
+    return content
+
+
+@traceable(name="Learning Agent", tags=["agent", "career-guidance"])
+async def run_learning_agent(db, user_id: str, user_message: str = None) -> dict:
+    """
+    Agentic learning assistant that:
+    1. Answers career and growth questions conversationally
+    2. Provides personalized task recommendations based on goals
+    3. Handles general career guidance queries
+    
+    Args:
+        db: Database connection
+        user_id: User identifier
+        user_message: Optional message from user. If "Updated the goals. Share the revised tasks.", 
+                     triggers task assignment mode. Otherwise, conversational mode.
+    """
+    try:
+        print(f"\n{'='*60}")
+        print(f"🚀 Starting learning agent for user: {user_id}")
+        print(f"📝 User message: {user_message}")
+        print(f"{'='*60}\n")
+        
+        mode, graph_input = await _prepare_run(db, user_id, user_message)
+        agent = get_agent_graphs()[mode]
+        
+        print("📄 Running agent...\n")
+        
+        # Run the shared graph; nodes and tools read the db from the invocation config
+        result = await agent.ainvoke(graph_input, config=_run_config(db, user_id))
         
         print("✅ Agent execution completed\n")
         
         # Extract final response
-        final_message = result["messages"][-1]
-        final_response = final_message.content if hasattr(final_message, 'content') else str(final_message)
-        
-        # Handle list content from Gemini
-        if isinstance(final_response, list):
-            content_parts = []
-            for part in final_response:
-                if isinstance(part, str):
-                    content_parts.append(part)
-                elif hasattr(part, 'text'):
-                    content_parts.append(part.text)
-                else:
-                    content_parts.append(str(part))
-            final_response = ''.join(content_parts).strip()
+        final_response = _message_text(result["messages"][-1])
+        await _remember(db, user_id, mode, user_message, final_response)
         
         print(f"{'='*60}")
-        print(f"✅ Agent completed successfully")
+        print("✅ Agent completed successfully")
         print(f"{'='*60}\n")
         print(f"Response:\n{final_response}\n")
         
@@ -372,4 +557,58 @@ The user has just updated their goals. Fetch their goals and provide an encourag
         return {
             "response_text": f"An error occurred: {str(e)}",
             "status": "error"
-        }
\ No newline at end of file
+        }
+
+async def stream_learning_agent(db, user_id: str, user_message: str = None) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Streaming counterpart of run_learning_agent, built on LangGraph's
+    astream_events. Yields (kind, data) pairs:
+      ("token", str)       - a chunk of model output as it is generated
+      ("step", str)        - a task-assignment stage started (prefetch, rank)
+      ("tool_start", str)  - a tool call started, by tool name
+      ("tool_end", str)    - a tool call finished
+      ("final", dict)      - last event, same shape as run_learning_agent's result
+    """
+    try:
+        print(f"🚀 Streaming learning agent for user: {user_id}")
+        mode, graph_input = await _prepare_run(db, user_id, user_message)
+        agent = get_agent_graphs()[mode]
+        config = _run_config(db, user_id)
+
+        final_response = None
+        streamed = False
+        async for event in agent.astream_events(graph_input, config=config, version="v2"):
+            kind = event["event"]
+            if kind == "on_chat_model_stream":
+                text = _message_text(event["data"]["chunk"])
+                if text:
+                    streamed = True
+                    yield "token", text
+            elif kind == "on_tool_start":
+                yield "tool_start", event["name"]
+            elif kind == "on_tool_end":
+                yield "tool_end", event["name"]
+            elif kind == "on_chain_start" and event.get("metadata", {}).get("langgraph_node") == event["name"]:
+                yield "step", event["name"]
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # The graph itself finished
+                final_response = _message_text(event["data"]["output"]["messages"][-1])
+
+        if final_response and not streamed:
+            # Answered without a model call (cached or fixed reply): send it whole
+            yield "token", final_response
+        if final_response:
+            await _remember(db, user_id, mode, user_message, final_response)
+        yield "final", {
+            "response_text": final_response or "I couldn't process your request.",
+            "status": "success" if final_response is not None else "error"
+        }
+
+    except Exception as e:
+        print(f"\n❌ ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        yield "final", {
+            "response_text": f"An error occurred: {str(e)}",
+            "status": "error"
+        }
@@ -0,0 +1,137 @@
+"""
+CPU cost of encoding a GET /tasks/user/{user_id} response.
+
+Compares the response_model path (TaskResponse objects, which FastAPI dumps,
+re-validates against List[TaskResponse], serializes and json.dumps) with
+the plain dicts + orjson path used by routers/tasks.py. Both start from the
+same in-memory assignment, task and project documents, so no database is
+needed and only encoding is measured.
+
+Usage: python benchmark_serialization.py [--counts 1000 10000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from models import TaskResponse
+from routers.tasks import _build_task_responses
+from utils import catalog
+from utils.responses import MongoJSONResponse
+
+PROJECT_COUNT = 5
+
+response_adapter = TypeAdapter(List[TaskResponse])
+
+
+def make_documents(count: int):
+    projects = {
+        str(ObjectId()): {"name": f"Bench Project {i}", "status": "active", "created_at": datetime.now()}
+        for i in range(PROJECT_COUNT)
+    }
+    project_ids = list(projects)
+    tasks = {
+        str(ObjectId()): {
+            "project_id": project_ids[i % PROJECT_COUNT],
+            "title": f"Bench Task {i}",
+            "description": "Seeded by benchmark_serialization.py",
+            "status": "pending"
+        }
+        for i in range(count)
+    }
+    assignments = [
+        {
+            "taskId": task_id,
+            "assignedBy": "admin",
+            "sequenceId": i + 1,
+            "rank": f"{i:06d}V",
+            "isCompleted": i % 3 == 0,
+            "comments": [{"comment": "Looks good", "commentBy": "admin", "createdAt": datetime.now()}]
+        }
+        for i, task_id in enumerate(tasks)
+    ]
+    return projects, tasks, assignments
+
+
+def prime_catalog(projects: dict, tasks: dict):
+    """Put the documents in the catalog cache so _build_task_responses never queries."""
+    for project_id, project in projects.items():
+        catalog.catalog_cache.set(f"project:{project_id}", {**project, "id": project_id})
+    for task_id, task in tasks.items():
+        catalog.catalog_cache.set(f"task:{task_id}", {**task, "id": task_id})
+
+
+def response_model_path(projects: dict, tasks: dict, assignments: list) -> bytes:
+    """The previous implementation: model objects, then FastAPI's response_model handling."""
+    objects = []
+    for assignment in assignments:
+        task = tasks[assignment["taskId"]]
+        project = projects[task["project_id"]]
+        objects.append(TaskResponse(
+            taskId=assignment["taskId"],
+            name=task.get("title", ""),
+            description=task.get("description"),
+            projectId=task["project_id"],
+            projectName=project.get("name", ""),
+            assignedBy=assignment.get("assignedBy", "admin"),
+            sequenceId=assignment.get("sequenceId"),
+            rank=assignment.get("rank"),
+            isCompleted=assignment.get("isCompleted", False),
+            comments=assignment.get("comments", [])
+        ))
+    # What FastAPI's serialize_response does with a response_model
+    content = [obj.model_dump() for obj in objects]
+    validated = response_adapter.validate_python(content)
+    encoded = response_adapter.dump_python(validated, mode="json")
+    return json.dumps(encoded, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+async def fast_path(assignments: list) -> bytes:
+    return MongoJSONResponse(await _build_task_responses(None, assignments)).body
+
+
+async def cpu_ms(fn, repeat: int) -> float:
+    """Median CPU time of `fn()` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        await fn()
+        samples.append((time.process_time() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+async def main(counts, repeat: int):
+    print(f"{'tasks':>8} {'response_model (ms)':>20} {'orjson (ms)':>12} {'speedup':>8}")
+    print("-" * 52)
+
+    for count in counts:
+        projects, tasks, assignments = make_documents(count)
+        catalog.catalog_cache.clear()
+        catalog.catalog_cache.maxsize = max(catalog.catalog_cache.maxsize, count + PROJECT_COUNT)
+        prime_catalog(projects, tasks)
+
+        async def before():
+            response_model_path(projects, tasks, assignments)
+
+        async def after():
+            await fast_path(assignments)
+
+        before_ms = await cpu_ms(before, repeat)
+        after_ms = await cpu_ms(after, repeat)
+        print(f"{count:>8} {before_ms:>20.1f} {after_ms:>12.1f} {before_ms / after_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.counts, args.repeat))
@@ -0,0 +1,142 @@
+"""
+Benchmark for GET /tasks/user/{user_id}
+Compares the old per-assignment lookup loop (two find_one calls per task)
+with the batched $in join used by routers/tasks.py, for growing
+assignment counts. The new path is timed cold (catalog cache cleared
+before every call, so each call runs the $in queries) and warm (served
+from the catalog cache).
+
+Seeds a throwaway database on MONGODB_URL and drops it when done.
+
+Usage: python benchmark_user_tasks.py [--counts 10 50 100 300] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from models import TaskResponse
+from routers.tasks import get_user_tasks
+from utils import catalog
+from utils.pagination import PageParams
+
+load_dotenv()
+
+BENCH_DB = "bench_user_tasks"
+PROJECT_COUNT = 5
+
+
+async def baseline_get_user_tasks(db, user_id: str):
+    """The original implementation: one task and one project read per assignment."""
+    assignment = await db.assignments.find_one({"userId": user_id})
+    if not assignment or not assignment.get("tasks"):
+        return []
+
+    response_tasks = []
+    for task_assignment in assignment["tasks"]:
+        task_id = task_assignment["taskId"]
+        if not ObjectId.is_valid(task_id):
+            continue
+        task = await db.tasks.find_one({"_id": ObjectId(task_id)})
+        if not task:
+            continue
+        project = await db.projects.find_one({"_id": ObjectId(task["project_id"])})
+        if not project:
+            continue
+        response_tasks.append(TaskResponse(
+            taskId=task_id,
+            name=task.get("title", ""),
+            description=task.get("description"),
+            projectId=task["project_id"],
+            projectName=project.get("name", ""),
+            assignedBy=task_assignment.get("assignedBy", "admin"),
+            sequenceId=task_assignment.get("sequenceId"),
+            isCompleted=task_assignment.get("isCompleted", False),
+            comments=task_assignment.get("comments", [])
+        ))
+    return response_tasks
+
+
+async def seed(db, user_id: str, count: int):
+    """Create `count` tasks spread over a few projects and assign them all to `user_id`."""
+    projects = await db.projects.insert_many([
+        {"name": f"Bench Project {i}", "status": "active"} for i in range(PROJECT_COUNT)
+    ])
+    project_ids = [str(pid) for pid in projects.inserted_ids]
+
+    tasks = await db.tasks.insert_many([
+        {
+            "project_id": project_ids[i % PROJECT_COUNT],
+            "title": f"Bench Task {i}",
+            "description": "Seeded by benchmark_user_tasks.py",
+            "status": "pending"
+        }
+        for i in range(count)
+    ])
+
+    await db.assignments.insert_one({
+        "userId": user_id,
+        "tasks": [
+            {
+                "taskId": str(tid),
+                "assignedBy": "admin",
+                "sequenceId": i + 1,
+                "isCompleted": False,
+                "comments": []
+            }
+            for i, tid in enumerate(tasks.inserted_ids)
+        ]
+    })
+
+
+async def time_call(fn, repeat: int, setup=None) -> float:
+    """Return the median wall time of `fn()` in milliseconds; `setup()` runs untimed before each call."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+async def main(counts, repeat: int):
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    db = client[BENCH_DB]
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(db=db)))
+
+    print(f"{'assignments':>12} {'before (ms)':>12} {'cold (ms)':>12} {'warm (ms)':>12} {'speedup':>8}")
+    print("-" * 61)
+
+    try:
+        for count in counts:
+            await client.drop_database(BENCH_DB)
+            user_id = f"bench_user_{count}"
+            await seed(db, user_id, count)
+
+            before = await time_call(lambda: baseline_get_user_tasks(db, user_id), repeat)
+            call = lambda: get_user_tasks(request, user_id, PageParams(limit=None, after=None))
+            cold = await time_call(call, repeat, setup=catalog.catalog_cache.clear)
+            warm = await time_call(call, repeat)
+
+            print(f"{count:>12} {before:>12.1f} {cold:>12.1f} {warm:>12.1f} {before / cold:>7.1f}x")
+    finally:
+        await client.drop_database(BENCH_DB)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100, 300, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.counts, args.repeat))
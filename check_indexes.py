@@ -0,0 +1,58 @@
+"""
+Build missing indexes and verify that request-path queries use them.
+
+Prints the indexes created, the ones that failed to build (e.g. a unique
+index over duplicate data) and existing indexes not declared in
+utils/indexes.py. With --explain, also explains every declared query shape
+and exits with status 1 if any of them would scan a whole collection, so
+it can gate a deploy or CI run against a seeded database.
+
+Usage: python check_indexes.py [--explain]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.indexes import check_query_plans, ensure_indexes
+
+load_dotenv()
+
+
+async def main(explain: bool) -> int:
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    db = client[os.getenv("DATABASE_NAME", "projects")]
+
+    try:
+        report = await ensure_indexes(db)
+        for name in report["created"]:
+            print(f"📇 Created {name}")
+        for failure in report["failed"]:
+            print(f"❌ Failed {failure}")
+        for name in report["unmanaged"]:
+            print(f"ℹ️ Not declared: {name}")
+
+        status = 1 if report["failed"] else 0
+        if explain:
+            problems = await check_query_plans(db)
+            for problem in problems:
+                print(f"❌ COLLSCAN: {problem}")
+            if problems:
+                status = 1
+            else:
+                print("✅ Every query shape uses an index")
+        return status
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ensure indexes and check query plans")
+    parser.add_argument("--explain", action="store_true", help="fail if any query plan is a COLLSCAN")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.explain)))
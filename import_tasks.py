@@ -0,0 +1,53 @@
+"""
+Bulk-import tasks from an NDJSON or CSV file into the `tasks` collection.
+
+Usage: python import_tasks.py tasks.ndjson [--format csv] [--batch-size 500]
+"""
+
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.task_import import import_tasks, DEFAULT_BATCH_SIZE, FORMATS
+
+load_dotenv()
+
+CHUNK_SIZE = 64 * 1024
+
+
+async def read_chunks(path: str):
+    """Yield the file in fixed-size chunks so it is never fully loaded."""
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def main(path: str, fmt: str, batch_size: int):
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    db = client[os.getenv("DATABASE_NAME", "projects")]
+
+    try:
+        summary = await import_tasks(db, read_chunks(path), fmt, batch_size)
+    finally:
+        client.close()
+
+    print(f"✅ Inserted {summary['inserted']} task(s)")
+    if summary["failed"]:
+        print(f"❌ {summary['failed']} row(s) failed:")
+        for error in summary["errors"]:
+            print(f"   row {error['row']}: {error['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-import tasks")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="defaults to csv for .csv files, ndjson otherwise")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    asyncio.run(main(args.path, fmt, args.batch_size))
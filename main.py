@@ -1,4 +1,5 @@
 import os
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -7,25 +8,56 @@ from dotenv import load_dotenv
 
 from routers import projects, chat, goals,tasks
 from agents.learning_agent import get_learning_agent
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.cache import cache_stats
+from utils import coherence, jobs
+from utils.indexes import ensure_indexes
+from utils.mongo_metrics import command_counter
+from utils.llm_cache import llm_cache_stats
+from utils.rate_limit import rate_limit_stats
 
 load_dotenv()
 
 
+async def _build_indexes(db):
+    try:
+        report = await ensure_indexes(db)
+    except Exception as e:
+        print(f"⚠️ Index check failed: {e}")
+        return
+    for name in report["created"]:
+        print(f"📇 Created index {name}")
+    for failure in report["failed"]:
+        print(f"⚠️ Could not create index {failure}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # DB Setup
-    client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL"), event_listeners=[command_counter])
     db = client[os.getenv("DATABASE_NAME", "projects")]
     app.state.db = db
 
-    # Initialize Agent
+    # Initialize Agent (warms the shared LLM client and compiled graphs)
     app.state.agent = get_learning_agent(db)
 
-    # Indexes
-    await db.chats.create_index([("userId", 1), ("timestamp", 1)])
+    # Indexes are built in the background so startup does not wait on them
+    index_build = asyncio.create_task(_build_indexes(db))
+
+    # Cross-worker cache invalidation
+    await coherence.poll(db)
+    poller = asyncio.create_task(coherence.run_poller(db))
+
+    # Bounded pool running queued agent jobs
+    workers = jobs.start_workers(db)
 
     print("🚀 API and Agent Ready")
     yield
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    poller.cancel()
+    index_build.cancel()
     client.close()
 
 
@@ -36,6 +68,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include Routers
@@ -50,6 +83,18 @@ async def health():
     return {"status": "healthy", "timestamp": "2026-01-06T15:24:00Z"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Cache, LLM, job queue, rate limit and MongoDB command counters for this worker"""
+    return {
+        "caches": cache_stats(),
+        "llmCache": llm_cache_stats(),
+        "jobs": jobs.job_stats(),
+        "llmRateLimit": rate_limit_stats(),
+        "mongoCommands": command_counter.snapshot()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
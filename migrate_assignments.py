@@ -0,0 +1,160 @@
+"""
+Online migration from the embedded `assignments.tasks` arrays to the
+normalized `task_assignments` collection (one document per userId + taskId).
+
+Procedure:
+1. Deploy with ASSIGNMENTS_LAYOUT=dual so new writes land in both layouts.
+2. Run `python migrate_assignments.py` to copy existing assignments across.
+3. Run `python migrate_assignments.py --verify` to repair anything that was
+   written while step 2 was in progress.
+4. Switch to ASSIGNMENTS_LAYOUT=normalized.
+
+The copy is idempotent and safe to re-run: inserts use $setOnInsert, so
+documents already written by the dual layout are never overwritten.
+"""
+
+import argparse
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+from utils.assignment_store import ASSIGNMENT_FIELDS
+
+load_dotenv()
+
+
+def _normalized_doc(user_id: str, task: dict) -> dict:
+    doc = {field: task.get(field) for field in ASSIGNMENT_FIELDS}
+    doc["isCompleted"] = doc["isCompleted"] or False
+    doc["comments"] = doc["comments"] or []
+    doc["userId"] = user_id
+    return doc
+
+
+async def copy_assignments(db, batch_size: int) -> int:
+    """Copy every embedded assignment that does not exist yet in the normalized layout."""
+    copied = 0
+    operations = []
+
+    async for assignment in db.assignments.find({}, {"userId": 1, "tasks": 1}):
+        user_id = assignment["userId"]
+        for task in assignment.get("tasks", []):
+            if not task.get("taskId"):
+                continue
+            operations.append(UpdateOne(
+                {"userId": user_id, "taskId": task["taskId"]},
+                {"$setOnInsert": _normalized_doc(user_id, task)},
+                upsert=True
+            ))
+
+        if len(operations) >= batch_size:
+            result = await db.task_assignments.bulk_write(operations, ordered=False)
+            copied += result.upserted_count
+            operations = []
+
+    if operations:
+        result = await db.task_assignments.bulk_write(operations, ordered=False)
+        copied += result.upserted_count
+
+    return copied
+
+
+def _expected_docs(user_id: str, assignment: Optional[dict]) -> Dict[str, dict]:
+    """Normalized documents for a user's embedded tasks, by taskId."""
+    return {
+        task["taskId"]: _normalized_doc(user_id, task)
+        for task in (assignment or {}).get("tasks", []) if task.get("taskId")
+    }
+
+
+def _differences(expected: Dict[str, dict], actual: Dict[str, dict]) -> Tuple[List[str], List[str]]:
+    """(taskIds whose normalized document is missing or differs, taskIds with no embedded task)."""
+    differing = [
+        task_id for task_id, doc in expected.items()
+        if {k: actual.get(task_id, {}).get(k) for k in doc} != doc
+    ]
+    stale = [task_id for task_id in actual if task_id not in expected]
+    return differing, stale
+
+
+async def verify_assignments(db, batch_size: int) -> int:
+    """Rewrite normalized documents that differ from the embedded source of truth."""
+    repaired = 0
+    operations = []
+
+    async for assignment in db.assignments.find({}, {"userId": 1, "tasks": 1}):
+        user_id = assignment["userId"]
+        actual = {
+            doc["taskId"]: doc
+            async for doc in db.task_assignments.find({"userId": user_id}, {"_id": 0})
+        }
+        differing, stale = _differences(_expected_docs(user_id, assignment), actual)
+        if not differing and not stale:
+            continue
+
+        # A dual-mode write may have landed between the two reads above, so the
+        # repair is computed from the embedded tasks as they are now: a
+        # difference that write explains disappears instead of being reverted
+        current = await db.assignments.find_one({"userId": user_id}, {"tasks": 1})
+        expected = _expected_docs(user_id, current)
+        differing, stale = _differences(expected, actual)
+
+        for task_id in differing:
+            if task_id in actual:
+                # Only while the document still holds what was read: a newer write wins
+                observed = {k: actual[task_id].get(k) for k in expected[task_id]}
+                operations.append(UpdateOne(
+                    {**observed, "userId": user_id, "taskId": task_id},
+                    {"$set": expected[task_id]}
+                ))
+            else:
+                operations.append(UpdateOne(
+                    {"userId": user_id, "taskId": task_id},
+                    {"$setOnInsert": expected[task_id]},
+                    upsert=True
+                ))
+        if stale:
+            await db.task_assignments.delete_many({"userId": user_id, "taskId": {"$in": stale}})
+            repaired += len(stale)
+
+        if len(operations) >= batch_size:
+            result = await db.task_assignments.bulk_write(operations, ordered=False)
+            repaired += result.modified_count + result.upserted_count
+            operations = []
+
+    if operations:
+        result = await db.task_assignments.bulk_write(operations, ordered=False)
+        repaired += result.modified_count + result.upserted_count
+
+    return repaired
+
+
+async def main(verify: bool, batch_size: int):
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    db = client[os.getenv("DATABASE_NAME", "projects")]
+
+    try:
+        await db.task_assignments.create_index([("userId", 1), ("taskId", 1)], unique=True)
+
+        if verify:
+            repaired = await verify_assignments(db, batch_size)
+            print(f"✅ Verified task_assignments, repaired {repaired} document(s)")
+        else:
+            copied = await copy_assignments(db, batch_size)
+            print(f"✅ Copied {copied} assignment(s) into task_assignments")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate assignments to the normalized layout")
+    parser.add_argument("--verify", action="store_true",
+                        help="compare both layouts and repair differences")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.verify, args.batch_size))
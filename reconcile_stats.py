@@ -0,0 +1,45 @@
+"""
+Recompute the project_stats and user_stats counters from the source
+collections, repairing any drift from partial failures.
+
+Safe to run while the API is serving traffic; schedule it periodically
+(e.g. nightly via cron).
+
+Usage: python reconcile_stats.py [--projects-only | --users-only]
+"""
+
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from utils.stats import reconcile_project_stats, reconcile_user_stats
+
+load_dotenv()
+
+
+async def main(projects: bool, users: bool):
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URL"))
+    db = client[os.getenv("DATABASE_NAME", "projects")]
+
+    try:
+        if projects:
+            written = await reconcile_project_stats(db)
+            print(f"✅ Reconciled counters for {written} project(s)")
+        if users:
+            written = await reconcile_user_stats(db)
+            print(f"✅ Reconciled counters for {written} user(s)")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile progress counters")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--projects-only", action="store_true")
+    group.add_argument("--users-only", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(main(projects=not args.users_only, users=not args.projects_only))
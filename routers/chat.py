@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Request, Body, HTTPException
+import hashlib
+import os
+from fastapi import APIRouter, Request, Body, HTTPException, Depends, Header, Query
 from datetime import datetime
 from models import Chat
-from agents.learning_agent import run_learning_agent, handle_agent_name_update
+from agents.learning_agent import stream_learning_agent, handle_agent_name_update, detect_mode
 from bson import ObjectId
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from utils.helpers import serialize
+from utils.pagination import PageParams, fetch_page, page_cursor, set_next_cursor
+from utils.streaming import StreamFormat, stream_cursor
+from pymongo import ReturnDocument
+from utils.responses import MongoJSONResponse, dumps
+from utils.task_parser import TaskStreamParser
+from fastapi.responses import JSONResponse, StreamingResponse
+from utils import jobs, memory
+from utils.rate_limit import RateLimited, admit
+from typing import Optional, Any
 
 router = APIRouter()
 
+# Seconds POST /agent holds the request open for a queued run before answering 202
+AGENT_REPLY_WAIT = float(os.getenv("AGENT_REPLY_WAIT", "60"))
+
 
 class AgentRequest(BaseModel):
     """Simplified request model for agent endpoint"""
@@ -26,78 +40,21 @@ class GetAgentRequest(BaseModel):
     userId: str
 
 
-def serialize(doc):
-    """Helper to convert MongoDB _id to string id"""
-    if not doc: 
-        return None
-    doc["id"] = str(doc.pop("_id"))
-    return doc
-
-
-def parse_agent_response_to_tasks(response_text: str) -> List[Dict[str, Any]]:
+async def _agent_reply(db, payload: dict, job_id: str) -> dict:
     """
-    Parse the agent's response text to extract tasks.
-    Expected format: numbered list like "1. Task description 2. Another task..."
-    Returns a list of task objects with taskId and name.
+    Job handler for "agent_reply": run the agent for a message, store the
+    reply in the chat history and return the /agent response body.
+    The reply is stored once per job, however many times the job runs.
+    Tokens, tasks and steps are published as they come, for /agent/stream.
     """
-    tasks = []
-    
-    # Split by newlines first to handle multi-line format
-    lines = response_text.strip().split('\n')
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Try to match numbered format: "1. Task name" or "1) Task name"
-        import re
-        match = re.match(r'^(\d+)[.\)]\s*(.+)$', line)
-        
-        if match:
-            task_number = match.group(1)
-            task_description = match.group(2).strip()
-            
-            # Generate a taskId (you might want to use actual task IDs from your database)
-            # For now, using a simple format: "suggested_task_{number}"
-            task_id = f"suggested_task_{task_number}"
-            
-            tasks.append({
-                "taskId": task_id,
-                "name": task_description,
-                "isSuggested": True  # Flag to indicate this is an AI-suggested task
-            })
-    
-    # Fallback: if no numbered items found, try splitting by common delimiters
-    if not tasks:
-        # Try splitting by numbers followed by period/parenthesis
-        parts = re.split(r'\d+[.\)]\s*', response_text)
-        for i, part in enumerate(parts[1:], 1):  # Skip first empty part
-            if part.strip():
-                tasks.append({
-                    "taskId": f"suggested_task_{i}",
-                    "name": part.strip(),
-                    "isSuggested": True
-                })
-    
-    return tasks
-
-
-@router.post("/agent", status_code=200)
-async def chat_with_agent(request: Request, agent_req: AgentRequest = Body(...)):
-    """
-    Invoke the learning agent for a user.
-    Accepts optional message parameter for conversational queries or task updates.
-    Returns both a message and a structured tasks array for UI rendering.
-    """
-    db = request.app.state.db
-    user_id = agent_req.userId
-    message = agent_req.message
+    user_id = payload["userId"]
+    message = payload.get("message")
 
     print(f"🚀 Agent invoked for user: {user_id}")
     if message:
         print(f"📝 With message: {message}")
 
+    parser = TaskStreamParser()
     try:
         # Check if this is an agent name update message
         if message and message.startswith("Updated the name of the agent to "):
@@ -105,20 +62,28 @@ async def chat_with_agent(request: Request, agent_req: AgentRequest = Body(...))
             agent_response = await handle_agent_name_update(db, user_id, message)
             status = "success"
             tasks = []  # No tasks for name update
+            jobs.publish(job_id, "token", {"text": agent_response})
         else:
             # Regular learning agent invocation with optional message
             print("⚙️ Running learning agent...")
-            result = await run_learning_agent(db, user_id, message)
-            agent_response = result.get("response_text", "I couldn't process your request.")
-            status = result.get("status", "error")
-            
-            # Parse the response to extract tasks only if it looks like a task list
-            print("🔍 Parsing response for tasks...")
-            if _is_task_list_response(agent_response):
-                tasks = parse_agent_response_to_tasks(agent_response)
+            agent_response, status = "I couldn't process your request.", "error"
+            async for kind, data in stream_learning_agent(db, user_id, message):
+                if kind == "token":
+                    jobs.publish(job_id, "token", {"text": data})
+                    # Tasks are extracted line by line, only if the reply is a task list
+                    for task in parser.feed(data):
+                        jobs.publish(job_id, "task", task)
+                elif kind == "final":
+                    agent_response, status = data["response_text"], data["status"]
+                else:
+                    jobs.publish(job_id, kind, {"name": data})
+
+            for task in parser.close():
+                jobs.publish(job_id, "task", task)
+            tasks = parser.tasks if parser.is_task_list else []
+            if tasks:
                 print(f"✅ Extracted {len(tasks)} tasks from response")
             else:
-                tasks = []
                 print("ℹ️ Response is conversational (no tasks to extract)")
         
         print(f"✅ Agent completed with status: {status}")
@@ -130,40 +95,190 @@ async def chat_with_agent(request: Request, agent_req: AgentRequest = Body(...))
         status = "error"
         tasks = []
 
-    # Store agent chat in database
-    agent_chat_doc = {
-        "userId": user_id,
-        "userType": "agent",
-        "message": agent_response,
-        "timestamp": datetime.now()
-    }
-
-    result = await db.chats.insert_one(agent_chat_doc)
-    print(f"💾 Stored agent response in chat history")
-
-    created_chat = await db.chats.find_one({"_id": result.inserted_id})
+    # Store agent chat in database; a retried run replaces its earlier reply
+    agent_chat_doc = await db.chats.find_one_and_update(
+        {"jobId": job_id},
+        {
+            "$set": {"message": agent_response, "timestamp": datetime.now()},
+            "$setOnInsert": {"userId": user_id, "userType": "agent"}
+        },
+        projection={"jobId": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    print("💾 Stored agent response in chat history")
     
     # Return structured response with both message and tasks
     return {
-        **serialize(created_chat),
+        **serialize(agent_chat_doc),
         "tasks": tasks,  # Add tasks array to response
         "status": status
     }
 
 
-def _is_task_list_response(text: str) -> bool:
-    """Check if response looks like a task list (has numbered items)"""
-    lines = text.strip().split('\n')
-    numbered_lines = [l for l in lines if l.strip() and l.strip()[0].isdigit()]
-    return len(numbered_lines) >= 3  # At least 3 numbered items
+jobs.register("agent_reply", _agent_reply)
+
+
+def _dedup_key(user_id: str, message: Optional[str]) -> str:
+    normalized = " ".join((message or "").lower().split())
+    digest = hashlib.sha256(normalized.encode()).hexdigest()
+    return f"{user_id}:{detect_mode(message)}:{digest}"
+
+
+async def _admit(db, user_id: str):
+    """429 with Retry-After when the agent backlog is too deep (utils/rate_limit.py)."""
+    try:
+        await admit(db, user_id)
+    except RateLimited as e:
+        print(f"⏳ Rate limited user {user_id}: {e}")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+async def _enqueue_reply(db, agent_req: AgentRequest, idempotency_key: Optional[str]) -> str:
+    """Admit a run and queue it, or join the identical one in progress; returns the job id."""
+    user_id = agent_req.userId
+    await _admit(db, user_id)
+    job_id = await jobs.enqueue(
+        db, "agent_reply",
+        {"userId": user_id, "message": agent_req.message},
+        user_id=user_id,
+        dedup_key=_dedup_key(user_id, agent_req.message),
+        idempotency_key=f"{user_id}:{idempotency_key}" if idempotency_key else None
+    )
+    print(f"📥 Queued agent job {job_id} for user: {user_id}")
+    return job_id
+
+
+@router.post("/agent", status_code=200)
+async def chat_with_agent(
+    request: Request,
+    agent_req: AgentRequest = Body(...),
+    background: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Invoke the learning agent for a user.
+    Accepts optional message parameter for conversational queries or task updates.
+    Returns both a message and a structured tasks array for UI rendering.
+
+    Runs are queued and executed by a bounded worker pool (utils/jobs.py).
+    The response waits for the reply unless background=true or it takes
+    longer than AGENT_REPLY_WAIT seconds; either way 202 {"jobId"} is
+    returned and the reply is fetched from GET /chat/jobs/{jobId}.
+
+    Requests identical to one still running (same user, mode and message up
+    to case and spacing) share its run and reply instead of starting their
+    own. Sending the same Idempotency-Key header returns the original run
+    even after it finished.
+    """
+    db = request.app.state.db
+    job_id = await _enqueue_reply(db, agent_req, idempotency_key)
+
+    status = "queued"
+    if not background:
+        job = await jobs.wait_for(db, job_id, AGENT_REPLY_WAIT)
+        if job and job["status"] == "done":
+            return job["result"]
+        if job and job["status"] == "failed":
+            raise HTTPException(status_code=500, detail=f"Agent run failed: {job.get('error')}")
+        status = job["status"] if job else status
+
+    return JSONResponse(status_code=202, content={"jobId": job_id, "status": status})
+
+
+@router.get("/jobs/{job_id}")
+async def get_agent_job(request: Request, job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """
+    State of a queued agent run: status is queued, running, done or failed.
+    "result" holds the /agent response body once done. Pass wait=<seconds>
+    to hold the request until the job finishes (long polling).
+    """
+    db = request.app.state.db
+    job = await jobs.wait_for(db, job_id, wait)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    response = {"jobId": job_id, "status": job["status"]}
+    if job["status"] == "done":
+        response["result"] = job["result"]
+    elif job.get("error"):
+        response["error"] = job["error"]
+    return response
+
+
+def _sse(event: str, data: Any) -> bytes:
+    """One Server-Sent Events frame."""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+@router.post("/agent/stream")
+async def stream_chat_with_agent(
+    request: Request,
+    agent_req: AgentRequest = Body(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    Streaming variant of /agent as Server-Sent Events:
+    - job: {"jobId"} of the run, also readable from GET /chat/jobs/{jobId}
+    - token: {"text"} chunks of the reply as the model generates them
+    - task: a suggested task ({"taskId", "name", "isSuggested"}) as soon as its
+      line of the reply is complete
+    - step / tool_start / tool_end: {"name"} progress of the agent run
+    - done: the stored chat message with "tasks" and "status", same body as /agent
+    - error: {"detail"} when the run failed; the stream ends after it
+
+    The run is queued, admitted and shared with identical requests exactly
+    like /agent. Progress events come from runs executed in this process;
+    a run picked up by another process only sends done.
+    """
+    db = request.app.state.db
+    job_id = await _enqueue_reply(db, agent_req, idempotency_key)
+
+    async def events():
+        yield _sse("job", {"jobId": job_id})
+        try:
+            async for event, data in jobs.follow(db, job_id):
+                if event != "end":
+                    yield _sse(event, data)
+                elif data and data["status"] == "done":
+                    yield _sse("done", data["result"])
+                else:
+                    error = data.get("error") if data else "job not found"
+                    yield _sse("error", {"detail": f"Agent run failed: {error}"})
+        except Exception as e:
+            print(f"❌ Agent stream for job {job_id} failed: {e}")
+            yield _sse("error", {"detail": f"Agent run failed: {e}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so tokens are delivered as they arrive
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/history/{user_id}")
-async def get_chat_history(request: Request, user_id: str):
-    """Retrieve chat history for a specific user"""
+async def get_chat_history(
+    request: Request,
+    user_id: str,
+    page: PageParams = Depends(),
+    stream: Optional[StreamFormat] = None
+):
+    """
+    Retrieve chat history for a specific user, oldest first.
+    Pass stream=ndjson|array for long histories.
+    """
     db = request.app.state.db
-    cursor = db.chats.find({"userId": user_id}).sort("timestamp", 1)
-    return [serialize(doc) async for doc in cursor]
+    if stream:
+        cursor = page_cursor(db.chats, {"userId": user_id}, [("timestamp", 1), ("_id", 1)], page)
+        return stream_cursor(cursor, stream, page)
+
+    chats, next_cursor = await fetch_page(
+        db.chats, {"userId": user_id}, [("timestamp", 1), ("_id", 1)], page
+    )
+    response = MongoJSONResponse([serialize(doc) for doc in chats])
+    set_next_cursor(response, next_cursor)
+    return response
 
 
 @router.delete("/clear-history/{user_id}", status_code=200)
@@ -178,6 +293,8 @@ async def clear_chat_history(request: Request, user_id: str):
     try:
         # Delete all chat documents for this user
         result = await db.chats.delete_many({"userId": user_id})
+        # The agent should not remember a conversation the user deleted
+        await memory.clear(db, user_id)
         
         deleted_count = result.deleted_count
         print(f"✅ Deleted {deleted_count} chat messages")
@@ -210,29 +327,32 @@ async def manage_agent(request: Request, agent_req: ManageAgentRequest = Body(..
     if not agent_name or not agent_name.strip():
         raise HTTPException(status_code=400, detail="Agent name cannot be empty")
 
-    # Upsert agent document
-    result = await db.agents.update_one(
+    # Upsert agent document and get it back in the same round trip
+    now = datetime.now()
+    new_id = ObjectId()
+    agent = await db.agents.find_one_and_update(
         {"userId": user_id},
         {
             "$set": {
                 "agentName": agent_name.strip(),
-                "updated_at": datetime.now()
+                "updated_at": now
             },
             "$setOnInsert": {
-                "created_at": datetime.now()
+                "_id": new_id,
+                "created_at": now
             }
         },
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-
-    # Fetch the updated/created agent
-    agent = await db.agents.find_one({"userId": user_id})
+    # Only a document this call inserted carries the _id it proposed
+    action = "created" if agent["_id"] == new_id else "updated"
     
-    print(f"✅ Agent {'updated' if result.modified_count > 0 else 'created'} successfully")
+    print(f"✅ Agent {action} successfully")
     
     return {
         "status": "success",
-        "message": f"Agent name {'updated' if result.modified_count > 0 else 'created'} successfully",
+        "message": f"Agent name {action} successfully",
         "agent": serialize(agent)
     }
 
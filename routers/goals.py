@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Request, Body, HTTPException
+from fastapi import APIRouter, Request, Body, HTTPException, Depends
 from models import Goal
 from utils.helpers import serialize
+from utils.pagination import PageParams, fetch_page, page_cursor, set_next_cursor
+from utils.streaming import StreamFormat, stream_cursor
+from pymongo import ReturnDocument
+from utils.relevance import invalidate_goals
+from utils.responses import MongoJSONResponse
 from datetime import datetime
 from bson import ObjectId
 from pydantic import BaseModel
+from typing import Optional
 
 router = APIRouter()
 
@@ -20,11 +26,22 @@ class GetGoalsRequest(BaseModel):
 
 
 @router.get("/")
-async def get_all_goals(request: Request, userId: str = None):
+async def get_all_goals(
+    request: Request,
+    userId: str = None,
+    page: PageParams = Depends(),
+    stream: Optional[StreamFormat] = None
+):
     """Get all goals, optionally filtered by userId"""
     db = request.app.state.db
     query = {"userId": userId} if userId else {}
-    return [serialize(g) async for g in db.goals.find(query)]
+    if stream:
+        return stream_cursor(page_cursor(db.goals, query, [("_id", 1)], page), stream, page)
+
+    goals, next_cursor = await fetch_page(db.goals, query, [("_id", 1)], page)
+    response = MongoJSONResponse([serialize(g) for g in goals])
+    set_next_cursor(response, next_cursor)
+    return response
 
 
 @router.post("/", response_model=Goal, status_code=201)
@@ -32,16 +49,16 @@ async def set_user_goals(request: Request, goal_data: Goal = Body(...)):
     """Set or update user goals (upsert operation)"""
     db = request.app.state.db
 
-    await db.goals.update_one(
+    updated_goal = await db.goals.find_one_and_update(
         {"userId": goal_data.userId},
         {"$set": {
             "goals": goal_data.goals,
             "updated_at": datetime.now()
         }},
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-
-    updated_goal = await db.goals.find_one({"userId": goal_data.userId})
+    await invalidate_goals(db, goal_data.userId)
     return serialize(updated_goal)
 
 
@@ -78,29 +95,33 @@ async def manage_goals(request: Request, goals_req: ManageGoalsRequest = Body(..
     if len(goals_text) > 1024:
         raise HTTPException(status_code=400, detail="Goals cannot exceed 1024 characters")
 
-    # Upsert goals document
-    result = await db.goals.update_one(
+    # Upsert goals document and get it back in the same round trip
+    now = datetime.now()
+    new_id = ObjectId()
+    goals_doc = await db.goals.find_one_and_update(
         {"userId": user_id},
         {
             "$set": {
                 "goals": goals_text,
-                "updated_at": datetime.now()
+                "updated_at": now
             },
             "$setOnInsert": {
-                "created_at": datetime.now()
+                "_id": new_id,
+                "created_at": now
             }
         },
-        upsert=True
+        upsert=True,
+        return_document=ReturnDocument.AFTER
     )
-
-    # Fetch the updated/created goals
-    goals_doc = await db.goals.find_one({"userId": user_id})
+    await invalidate_goals(db, user_id)
+    # Only a document this call inserted carries the _id it proposed
+    action = "created" if goals_doc["_id"] == new_id else "updated"
     
-    print(f"✅ Goals {'updated' if result.modified_count > 0 else 'created'} successfully")
+    print(f"✅ Goals {action} successfully")
     
     return {
         "status": "success",
-        "message": f"Goals {'updated' if result.modified_count > 0 else 'created'} successfully",
+        "message": f"Goals {action} successfully",
         "goals": serialize(goals_doc)
     }
 
@@ -1,64 +1,109 @@
-from fastapi import APIRouter, Request, Body, HTTPException
-from models import Project, ProjectWithTasks, Task
+from fastapi import APIRouter, Request, Body, HTTPException, Depends
+from models import Project, ProjectWithTasks
 from utils.helpers import serialize
+from utils.pagination import PageParams, page_cursor, set_next_cursor
+from utils.streaming import StreamFormat, stream_cursor
+from utils.responses import MongoJSONResponse
+from utils import catalog
+from utils.stats import get_project_stats as read_project_stats
+from utils.analytics import get_project_analytics
 from bson import ObjectId
-from typing import List
+from typing import List, Optional
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[Project])
-async def list_projects(request: Request):
+async def list_projects(
+    request: Request,
+    page: PageParams = Depends(),
+    stream: Optional[StreamFormat] = None
+):
+    """Pass stream=ndjson|array to stream the list straight from the database."""
     db = request.app.state.db
-    cursor = db.projects.find().sort("created_at", -1)
-    return [serialize(doc) async for doc in cursor]
+    if stream:
+        cursor = page_cursor(
+            db.projects, {}, [("created_at", -1), ("_id", -1)], page, projection=catalog.PROJECT_FIELDS
+        )
+        return stream_cursor(cursor, stream, page, transform=catalog.serialize_project)
+
+    projects, next_cursor = await catalog.list_projects(db, page)
+    response = MongoJSONResponse(projects)
+    set_next_cursor(response, next_cursor)
+    return response
 
 
 @router.post("/", response_model=Project, status_code=201)
 async def create_new_project(request: Request, project: Project = Body(...)):
     db = request.app.state.db
     project_dict = project.model_dump(exclude={"id"})
+    # insert_one sets project_dict["_id"], so the payload is the stored document
     result = await db.projects.insert_one(project_dict)
+    await catalog.invalidate_project(db, str(result.inserted_id))
+    return serialize(project_dict)
 
-    new_project = await db.projects.find_one({"_id": result.inserted_id})
-    return serialize(new_project)
+
+@router.get("/analytics")
+async def project_analytics(request: Request, refresh: bool = False):
+    """
+    Dashboard summary for every project: task counts by status, users
+    assigned, average completion rate and most-commented tasks.
+    Cached briefly; pass refresh=true to recompute.
+    """
+    db = request.app.state.db
+    return await get_project_analytics(db, refresh=refresh)
 
 
 @router.get("/{project_id}", response_model=ProjectWithTasks)
-async def get_project_details(request: Request, project_id: str):
+async def get_project_details(
+    request: Request,
+    project_id: str,
+    page: PageParams = Depends(),
+    stream: Optional[StreamFormat] = None
+):
     """
-    Get project details along with all associated tasks.
+    Get project details along with associated tasks.
+    Pass limit/after to page through the tasks, or stream=ndjson|array to
+    stream them (with ndjson the first line is the project itself).
     """
     db = request.app.state.db
     
     if not ObjectId.is_valid(project_id):
         raise HTTPException(status_code=400, detail="Invalid Project ID")
 
-    project = await db.projects.find_one({"_id": ObjectId(project_id)})
-    if not project:
+    project_data = await catalog.get_project(db, project_id)
+    if not project_data:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    project_data = serialize(project)
-    
-    tasks_cursor = db.tasks.find({"project_id": project_id})
-    tasks = [serialize(task) async for task in tasks_cursor]
+    if stream:
+        cursor = page_cursor(
+            db.tasks, {"project_id": project_id}, [("_id", 1)], page, projection=catalog.TASK_FIELDS
+        )
+        return stream_cursor(
+            cursor, stream, page, transform=catalog.serialize_task, head=project_data, field="tasks"
+        )
+
+    tasks, next_cursor = await catalog.get_project_tasks(db, project_id, page)
     
     project_with_tasks = {
         **project_data,
         "tasks": tasks
     }
     
-    return project_with_tasks
+    response = MongoJSONResponse(project_with_tasks)
+    set_next_cursor(response, next_cursor)
+    return response
 
 
 @router.get("/{project_id}/stats")
 async def get_project_stats(request: Request, project_id: str):
     """Get statistics about tasks in a project"""
     db = request.app.state.db
-    tasks = await db.tasks.find({"project_id": project_id}).to_list(length=100)
+    stats = await read_project_stats(db, project_id)
+    status_counts = stats.get("status", {})
     return {
-        "total_tasks": len(tasks),
-        "completed": len([t for t in tasks if t["status"] == "completed"]),
-        "pending": len([t for t in tasks if t["status"] == "pending"]),
-        "in_progress": len([t for t in tasks if t["status"] == "in_progress"])
+        "total_tasks": stats.get("total", 0),
+        "completed": status_counts.get("completed", 0),
+        "pending": status_counts.get("pending", 0),
+        "in_progress": status_counts.get("in_progress", 0)
     }
\ No newline at end of file
@@ -1,13 +1,25 @@
-from fastapi import APIRouter, Request, Body, HTTPException
+from fastapi import APIRouter, Request, Body, HTTPException, Query, Depends
 from models import Task, TaskUpdate, UserTaskLink, TaskResponse
 from utils.helpers import serialize
+from utils.assignment_store import get_assignment_store
+from utils.ranking import allocate_sequence, allocate_sequences, rank_for_sequence, rank_between, ranks_between
+from utils.task_import import import_tasks, DEFAULT_BATCH_SIZE
+from utils.pagination import PageParams, set_next_cursor
+from utils.responses import MongoJSONResponse
+from utils import catalog, relevance
+from utils.stats import (
+    record_tasks_created, record_task_status_change, record_assignment_change,
+    reconcile_user_stats, get_user_stats
+)
 from bson import ObjectId
 from typing import List, Optional, Literal
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
+MAX_BATCH_OPERATIONS = 1000
+
 
 class TaskCommentRequest(BaseModel):
     """Request model for saving task comments"""
@@ -17,66 +29,143 @@ class TaskCommentRequest(BaseModel):
     commentBy: Optional[Literal["user", "admin"]] = "user"
 
 
+class AssignmentOperation(BaseModel):
+    """A single change to a user's task assignment"""
+    op: Literal["complete", "uncomplete", "comment", "set_sequence", "remove"]
+    userId: str
+    taskId: str
+    comment: Optional[str] = None
+    commentBy: Optional[Literal["user", "admin"]] = "user"
+    sequenceId: Optional[int] = None
+
+
+class BulkAssignRequest(BaseModel):
+    """Request model for assigning many tasks to many users"""
+    userIds: List[str]
+    taskIds: Optional[List[str]] = None
+    projectId: Optional[str] = None
+    assignedBy: Literal["user", "admin"] = "admin"
+
+
+class AssignmentBatchRequest(BaseModel):
+    """Request model for batched assignment changes"""
+    operations: List[AssignmentOperation] = Field(default_factory=list)
+
+
 @router.post("/", response_model=Task, status_code=201)
 async def create_task(request: Request, task: Task = Body(...)):
     db = request.app.state.db
     task_dict = task.model_dump(exclude={"id"})
-    result = await db.tasks.insert_one(task_dict)
-
-    new_task = await db.tasks.find_one({"_id": result.inserted_id})
-    return serialize(new_task)
+    # insert_one sets task_dict["_id"], so the payload is the stored document
+    await db.tasks.insert_one(task_dict)
+    await record_tasks_created(db, [task_dict])
+    await catalog.invalidate_tasks(db, project_ids=[task_dict["project_id"]])
+    relevance.index_tasks([task_dict])
+    return serialize(task_dict)
 
 
-@router.get("/user/{user_id}", response_model=List[TaskResponse])
-async def get_user_tasks(request: Request, user_id: str):
+@router.post("/import", status_code=200)
+async def import_tasks_stream(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=10000)
+):
     """
-    Get all tasks assigned to a user from the assignments collection.
+    Bulk-create tasks from an NDJSON or CSV request body.
+    The body is streamed and inserted in batches; invalid rows are skipped
+    and reported by row number (1-based, excluding the CSV header).
     """
     db = request.app.state.db
     
-    # Get user's assignment document
-    assignment = await db.assignments.find_one({"userId": user_id})
+    summary = await import_tasks(db, request.stream(), format, batch_size)
     
-    if not assignment or not assignment.get("tasks"):
-        return []
+    print(f"📥 Imported {summary['inserted']} tasks ({summary['failed']} failed)")
     
+    return {"status": "success", **summary}
+
+
+async def _build_task_responses(db, task_assignments: list) -> List[dict]:
+    """
+    Join task assignments with their task and project documents.
+    Reads go through the catalog cache; misses are fetched with one batched
+    $in query per collection, so the number of round trips stays constant
+    no matter how many tasks are assigned.
+    Returns plain dicts in the TaskResponse shape; the inputs were validated
+    when they were written, so they are not validated again here.
+    """
+    task_ids = [ta.get("taskId", "") for ta in task_assignments]
+    tasks_by_id = await catalog.get_tasks_by_ids(db, task_ids)
+    if not tasks_by_id:
+        return []
+
+    # Dedupe projects - many tasks usually share a handful of projects
+    projects_by_id = await catalog.get_projects_by_ids(
+        db, (task.get("project_id", "") for task in tasks_by_id.values())
+    )
+
     response_tasks = []
-    
-    for task_assignment in assignment["tasks"]:
-        task_id = task_assignment["taskId"]
-        
-        # Validate ObjectId
-        if not ObjectId.is_valid(task_id):
-            continue
-        
-        # Fetch task details
-        task = await db.tasks.find_one({"_id": ObjectId(task_id)})
+    for task_assignment in task_assignments:
+        task = tasks_by_id.get(task_assignment.get("taskId"))
         if not task:
             continue
-        
-        # Fetch project details
-        project = await db.projects.find_one({"_id": ObjectId(task["project_id"])})
+
+        project = projects_by_id.get(task["project_id"])
         if not project:
             continue
-        
-        # Build response
-        task_response = TaskResponse(
-            taskId=task_id,
-            name=task.get("title", ""),
-            description=task.get("description"),
-            projectId=task["project_id"],
-            projectName=project.get("name", ""),
-            assignedBy=task_assignment.get("assignedBy", "admin"),
-            sequenceId=task_assignment.get("sequenceId"),
-            isCompleted=task_assignment.get("isCompleted", False),
-            comments=task_assignment.get("comments", [])
-        )
-        
-        response_tasks.append(task_response)
-    
+
+        response_tasks.append({
+            "taskId": task_assignment["taskId"],
+            "name": task.get("title", ""),
+            "description": task.get("description"),
+            "projectId": task["project_id"],
+            "projectName": project.get("name", ""),
+            "assignedBy": task_assignment.get("assignedBy", "admin"),
+            "sequenceId": task_assignment.get("sequenceId"),
+            "rank": task_assignment.get("rank"),
+            "isCompleted": task_assignment.get("isCompleted", False),
+            "comments": task_assignment.get("comments", [])
+        })
+
     return response_tasks
 
 
+@router.get("/user/{user_id}", response_model=List[TaskResponse])
+async def get_user_tasks(
+    request: Request,
+    user_id: str,
+    page: PageParams = Depends()
+):
+    """
+    Get tasks assigned to a user from the assignments collection, in rank order.
+    Pass limit/after to page through them.
+    """
+    db = request.app.state.db
+    
+    # Get user's task assignments
+    task_assignments, next_cursor = await get_assignment_store(db).list_tasks_page(user_id, page)
+    
+    response = MongoJSONResponse(
+        await _build_task_responses(db, task_assignments) if task_assignments else []
+    )
+    set_next_cursor(response, next_cursor)
+    return response
+
+
+@router.get("/user/{user_id}/stats", status_code=200)
+async def get_user_task_stats(request: Request, user_id: str):
+    """Get assigned/completed counts for a user"""
+    db = request.app.state.db
+    stats = await get_user_stats(db, user_id)
+    assigned = stats.get("assigned", 0)
+    completed = stats.get("completed", 0)
+    return {
+        "userId": user_id,
+        "assigned": assigned,
+        "completed": completed,
+        "completionRate": completed / assigned if assigned else 0.0
+    }
+
+
 @router.put("/{task_id}", response_model=Task)
 async def update_task_status(request: Request, task_id: str, update: TaskUpdate):
     db = request.app.state.db
@@ -84,9 +173,23 @@ async def update_task_status(request: Request, task_id: str, update: TaskUpdate)
         raise HTTPException(status_code=400, detail="Invalid Task ID")
 
     update_data = {k: v for k, v in update.model_dump().items() if v is not None}
-    await db.tasks.update_one({"_id": ObjectId(task_id)}, {"$set": update_data})
+    # One round trip: the previous document gives the old status for the
+    # counters, and applying the top-level $set to it gives the new one
+    before = await db.tasks.find_one_and_update(
+        {"_id": ObjectId(task_id)},
+        {"$set": update_data}
+    ) if update_data else await db.tasks.find_one({"_id": ObjectId(task_id)})
+    if not before:
+        raise HTTPException(status_code=404, detail="Task not found")
 
-    updated = await db.tasks.find_one({"_id": ObjectId(task_id)})
+    if "status" in update_data:
+        await record_task_status_change(
+            db, before["project_id"], before.get("status"), update_data["status"]
+        )
+    await catalog.invalidate_tasks(db, project_ids=[before["project_id"]], task_ids=[task_id])
+    updated = {**before, **update_data}
+    if "title" in update_data or "description" in update_data:
+        relevance.index_tasks([updated])
     return serialize(updated)
 
 
@@ -107,23 +210,22 @@ async def link_user_to_task(request: Request, payload: UserTaskLink = Body(...))
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    # Reserve the next position on the server; client sequenceIds are ignored
+    sequence_id = await allocate_sequence(db, payload.userId)
+    
     # Create task assignment object
     task_assignment = {
         "taskId": payload.taskId,
         "assignedBy": payload.assignedBy,
-        "sequenceId": payload.sequenceId,
+        "sequenceId": sequence_id,
+        "rank": rank_for_sequence(sequence_id),
         "isCompleted": False,
         "comments": []
     }
     
     # Update or create assignment document
-    result = await db.assignments.update_one(
-        {"userId": payload.userId},
-        {
-            "$addToSet": {"tasks": task_assignment}
-        },
-        upsert=True
-    )
+    if await get_assignment_store(db).add_task(payload.userId, task_assignment):
+        await record_assignment_change(db, payload.userId, assigned=1)
     
     return {
         "status": "success", 
@@ -131,6 +233,67 @@ async def link_user_to_task(request: Request, payload: UserTaskLink = Body(...))
     }
 
 
+@router.post("/user-tasks/bulk", status_code=201)
+async def bulk_link_users_to_tasks(request: Request, payload: BulkAssignRequest = Body(...)):
+    """
+    Assign a list of tasks, or every task of a project, to a list of users.
+    Tasks a user already has are skipped; unknown taskIds are reported back.
+    """
+    db = request.app.state.db
+    
+    user_ids = list(dict.fromkeys(u for u in payload.userIds if u))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="userIds is required")
+    
+    if bool(payload.taskIds) == bool(payload.projectId):
+        raise HTTPException(status_code=400, detail="Provide either taskIds or projectId")
+    
+    # Resolve and validate tasks with a single query
+    if payload.projectId:
+        cursor = db.tasks.find({"project_id": payload.projectId}, {"_id": 1}).sort("_id", 1)
+        task_ids = [str(task["_id"]) async for task in cursor]
+        missing_task_ids = []
+    else:
+        requested = list(dict.fromkeys(payload.taskIds))
+        valid = [ObjectId(tid) for tid in requested if ObjectId.is_valid(tid)]
+        found = {str(task["_id"]) async for task in db.tasks.find({"_id": {"$in": valid}}, {"_id": 1})}
+        task_ids = [tid for tid in requested if tid in found]
+        missing_task_ids = [tid for tid in requested if tid not in found]
+    
+    if not task_ids:
+        raise HTTPException(status_code=404, detail="No matching tasks found")
+    
+    # Reserve a block of positions per user so the tasks keep the given order
+    last_sequences = await allocate_sequences(db, user_ids, len(task_ids))
+    
+    assignments = {}
+    for user_id in user_ids:
+        first = last_sequences[user_id] - len(task_ids) + 1
+        assignments[user_id] = [
+            {
+                "taskId": task_id,
+                "assignedBy": payload.assignedBy,
+                "sequenceId": first + i,
+                "rank": rank_for_sequence(first + i),
+                "isCompleted": False,
+                "comments": []
+            }
+            for i, task_id in enumerate(task_ids)
+        ]
+    
+    await get_assignment_store(db).bulk_add_tasks(assignments)
+    await reconcile_user_stats(db, user_ids)
+    
+    print(f"📌 Bulk assigned {len(task_ids)} tasks to {len(user_ids)} users")
+    
+    return {
+        "status": "success",
+        "message": f"{len(task_ids)} tasks assigned to {len(user_ids)} users",
+        "taskIds": task_ids,
+        "missingTaskIds": missing_task_ids
+    }
+
+
 @router.put("/user-tasks/{user_id}/{task_id}", status_code=200)
 async def update_user_task_assignment(
     request: Request, 
@@ -144,16 +307,27 @@ async def update_user_task_assignment(
     """
     Update a specific task assignment for a user.
     Can update completion status, sequence, or add comments.
+    A new sequenceId moves the task like rearrange-user-tasks does: ahead
+    of the first other task whose sequenceId is not lower.
     """
     db = request.app.state.db
+    store = get_assignment_store(db)
     
     update_fields = {}
     
-    if isCompleted is not None:
-        update_fields["tasks.$[elem].isCompleted"] = isCompleted
-    
     if sequenceId is not None:
-        update_fields["tasks.$[elem].sequenceId"] = sequenceId
+        # Lists are ordered by rank, so the new position needs a new rank
+        if not await store.find_task(user_id, task_id):
+            raise HTTPException(status_code=404, detail="Assignment not found")
+        ranks = await _sequence_ranks(db, store, user_id, [{"taskId": task_id, "sequenceId": sequenceId}])
+        update_fields.update(ranks[task_id])
+    
+    if isCompleted is not None:
+        changed = await store.set_completion(user_id, task_id, isCompleted)
+        if changed is None:
+            raise HTTPException(status_code=404, detail="Assignment not found")
+        if changed:
+            await record_assignment_change(db, user_id, completed=1 if isCompleted else -1)
     
     # Add comment if provided
     if comment and commentBy:
@@ -162,21 +336,13 @@ async def update_user_task_assignment(
             "commentBy": commentBy,
             "createdAt": datetime.now()
         }
-        await db.assignments.update_one(
-            {"userId": user_id},
-            {"$push": {"tasks.$[elem].comments": new_comment}},
-            array_filters=[{"elem.taskId": task_id}]
-        )
+        await store.push_comment(user_id, task_id, new_comment)
     
     # Update other fields if any
     if update_fields:
-        result = await db.assignments.update_one(
-            {"userId": user_id},
-            {"$set": update_fields},
-            array_filters=[{"elem.taskId": task_id}]
-        )
+        matched = await store.set_fields(user_id, task_id, update_fields)
         
-        if result.matched_count == 0:
+        if not matched:
             raise HTTPException(status_code=404, detail="Assignment not found")
     
     return {"status": "success", "message": "Assignment updated"}
@@ -184,10 +350,21 @@ async def update_user_task_assignment(
 @router.post("/rearrange-user-tasks", status_code=200)
 async def rearrange_user_tasks(request: Request, payload: dict = Body(...)):
     """
-    Rearrange tasks for a user by updating their sequenceId values.
-    Accepts a list of tasks with updated sequenceIds.
+    Rearrange tasks for a user.
+    
+    Request body, either:
+    - userId, taskId, afterTaskId and/or beforeTaskId - move one task right
+      after afterTaskId and/or right before beforeTaskId (send only
+      beforeTaskId for the top, neither for the end). Only the moved task's
+      rank changes.
+    - userId, tasks: [{taskId, sequenceId}] - set the sequenceId of the given
+      tasks and place them by it; tasks left out keep their place, so a
+      partial list only moves the tasks it names (ahead of a left-out task
+      with the same sequenceId, so sequenceId 1 is the top). Applied as a
+      single bulk write.
     """
     db = request.app.state.db
+    store = get_assignment_store(db)
     
     user_id = payload.get("userId")
     tasks = payload.get("tasks", [])
@@ -195,35 +372,143 @@ async def rearrange_user_tasks(request: Request, payload: dict = Body(...)):
     if not user_id:
         raise HTTPException(status_code=400, detail="userId is required")
     
+    if payload.get("taskId"):
+        return await _move_user_task(db, store, user_id, payload)
+    
     if not tasks:
         raise HTTPException(status_code=400, detail="tasks array is required")
     
     # Verify user assignment exists
-    assignment = await db.assignments.find_one({"userId": user_id})
-    if not assignment:
+    if not await store.has_user(user_id):
         raise HTTPException(status_code=404, detail="No assignments found for this user")
     
-    # Update sequenceId for each task
-    for task_update in tasks:
-        task_id = task_update.get("taskId")
-        sequence_id = task_update.get("sequenceId")
-        
-        if not task_id or sequence_id is None:
+    ordered = sorted(
+        (t for t in tasks if t.get("taskId") and t.get("sequenceId") is not None),
+        key=lambda t: t["sequenceId"]
+    )
+    if not ordered:
+        raise HTTPException(status_code=400, detail="tasks must include taskId and sequenceId")
+    
+    await store.bulk_set_fields(user_id, await _sequence_ranks(db, store, user_id, ordered))
+    
+    return {
+        "status": "success",
+        "message": f"Task order updated for user {user_id}"
+    }
+
+
+async def _sequence_ranks(db, store, user_id: str, ordered: List[dict]) -> dict:
+    """
+    Updates placing `ordered` (sorted by new sequenceId) among the user's
+    other tasks: each goes before the first unlisted task, in list order,
+    whose sequenceId is not lower than its own. Unlisted tasks keep their
+    ranks.
+    """
+    task_assignments = await store.list_tasks(user_id)
+    if any(not ta.get("rank") for ta in task_assignments):
+        await _backfill_ranks(db, store, user_id)
+        task_assignments = await store.list_tasks(user_id)
+    
+    listed = {t["taskId"] for t in ordered}
+    unlisted = [ta for ta in task_assignments if ta["taskId"] not in listed]
+    
+    # gap i lies before unlisted[i]; the last gap is the end of the list
+    gaps: List[List[dict]] = [[] for _ in range(len(unlisted) + 1)]
+    position = 0
+    for t in ordered:
+        while position < len(unlisted) and (unlisted[position].get("sequenceId") or 0) < t["sequenceId"]:
+            position += 1
+        gaps[position].append(t)
+    
+    updates = {}
+    for i, gap in enumerate(gaps):
+        if not gap:
             continue
-        
-        # Update the sequenceId for the specific task in the array
-        await db.assignments.update_one(
-            {"userId": user_id},
-            {"$set": {"tasks.$[elem].sequenceId": sequence_id}},
-            array_filters=[{"elem.taskId": task_id}]
+        if i == len(unlisted):
+            # The end takes fresh counter ranks so later appends stay after it
+            last = await allocate_sequence(db, user_id, len(gap))
+            ranks = [rank_for_sequence(seq) for seq in range(last - len(gap) + 1, last + 1)]
+        else:
+            before = unlisted[i - 1]["rank"] if i else None
+            ranks = ranks_between(before, unlisted[i]["rank"], len(gap))
+        for t, rank in zip(gap, ranks):
+            updates[t["taskId"]] = {"sequenceId": t["sequenceId"], "rank": rank}
+    return updates
+
+
+async def _move_user_task(db, store, user_id: str, payload: dict) -> dict:
+    """Give one task a rank between its new neighbours."""
+    task_id = payload["taskId"]
+    after_id = payload.get("afterTaskId")
+    before_id = payload.get("beforeTaskId")
+    
+    if not await store.find_task(user_id, task_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Task {task_id} not found in user's assignments"
+        )
+    
+    neighbour_ranks = {}
+    for neighbour_id in (after_id, before_id):
+        if not neighbour_id:
+            continue
+        neighbour = await store.find_task(user_id, neighbour_id)
+        if not neighbour:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Task {neighbour_id} not found in user's assignments"
+            )
+        if not neighbour.get("rank"):
+            # Legacy list without ranks: rank it once in its current order
+            await _backfill_ranks(db, store, user_id)
+            return await _move_user_task(db, store, user_id, payload)
+        neighbour_ranks[neighbour_id] = neighbour["rank"]
+    
+    if before_id:
+        try:
+            rank = rank_between(neighbour_ranks.get(after_id), neighbour_ranks[before_id])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="afterTaskId must be ordered before beforeTaskId")
+    elif after_id:
+        # Right after afterTaskId: ahead of whichever task follows it now
+        after_rank = neighbour_ranks[after_id]
+        task_assignments = await store.list_tasks(user_id)
+        if any(not ta.get("rank") for ta in task_assignments):
+            await _backfill_ranks(db, store, user_id)
+            return await _move_user_task(db, store, user_id, payload)
+        next_rank = next(
+            (ta["rank"] for ta in task_assignments
+             if ta["taskId"] != task_id and ta["rank"] > after_rank),
+            None
         )
+        if next_rank is not None:
+            rank = rank_between(after_rank, next_rank)
+        else:
+            rank = rank_for_sequence(await allocate_sequence(db, user_id))
+    else:
+        # Moving to the end takes a fresh counter rank so later appends stay after it
+        rank = rank_for_sequence(await allocate_sequence(db, user_id))
+    
+    await store.set_fields(user_id, task_id, {"rank": rank})
     
     return {
         "status": "success",
-        "message": f"Task order updated for user {user_id}"
+        "message": f"Task {task_id} moved for user {user_id}",
+        "rank": rank
     }
 
 
+async def _backfill_ranks(db, store, user_id: str):
+    """Assign ranks to every task of a user, keeping the current order."""
+    task_assignments = await store.list_tasks(user_id)
+    last = await allocate_sequence(db, user_id, len(task_assignments))
+    first = last - len(task_assignments) + 1
+    await store.bulk_set_fields(user_id, {
+        ta["taskId"]: {"rank": rank_for_sequence(first + i)}
+        for i, ta in enumerate(task_assignments)
+    })
+
+
 @router.post("/delete-user-task", status_code=200)
 async def delete_user_task(request: Request, payload: dict = Body(...)):
     """
@@ -231,6 +516,7 @@ async def delete_user_task(request: Request, payload: dict = Body(...)):
     Removes the task from the assignments collection.
     """
     db = request.app.state.db
+    store = get_assignment_store(db)
     
     user_id = payload.get("userId")
     task_id = payload.get("taskId")
@@ -242,22 +528,22 @@ async def delete_user_task(request: Request, payload: dict = Body(...)):
         raise HTTPException(status_code=400, detail="taskId is required")
     
     # Verify user assignment exists
-    assignment = await db.assignments.find_one({"userId": user_id})
-    if not assignment:
+    if not await store.has_user(user_id):
         raise HTTPException(status_code=404, detail="No assignments found for this user")
     
-    # Remove the task from the user's tasks array
-    result = await db.assignments.update_one(
-        {"userId": user_id},
-        {"$pull": {"tasks": {"taskId": task_id}}}
-    )
+    # Remove the task from the user's assignments
+    removed = await store.remove_task(user_id, task_id)
     
-    if result.modified_count == 0:
+    if not removed:
         raise HTTPException(
             status_code=404, 
             detail=f"Task {task_id} not found in user's assignments"
         )
     
+    await record_assignment_change(
+        db, user_id, assigned=-1, completed=-1 if removed.get("isCompleted") else 0
+    )
+    
     return {
         "status": "success",
         "message": f"Task {task_id} deleted from user {user_id}'s assignments"
@@ -277,19 +563,17 @@ async def save_task_comment(request: Request, payload: TaskCommentRequest = Body
     - commentBy: str (optional) - Either "user" or "admin", defaults to "user"
     """
     db = request.app.state.db
+    store = get_assignment_store(db)
     
     # Validate that comment is not empty after stripping
     if not payload.comment.strip():
         raise HTTPException(status_code=400, detail="comment cannot be empty")
     
-    # Verify user assignment exists
-    assignment = await db.assignments.find_one({"userId": payload.userId})
-    if not assignment:
-        raise HTTPException(status_code=404, detail="No assignments found for this user")
-    
     # Verify task exists in user's assignments
-    task_found = any(task.get("taskId") == payload.taskId for task in assignment.get("tasks", []))
-    if not task_found:
+    if not await store.find_task(payload.userId, payload.taskId):
+        if not await store.has_user(payload.userId):
+            raise HTTPException(status_code=404, detail="No assignments found for this user")
+
         raise HTTPException(
             status_code=404, 
             detail=f"Task {payload.taskId} not found in user's assignments"
@@ -303,13 +587,9 @@ async def save_task_comment(request: Request, payload: TaskCommentRequest = Body
     }
     
     # Add comment to the task's comments array
-    result = await db.assignments.update_one(
-        {"userId": payload.userId},
-        {"$push": {"tasks.$[elem].comments": new_comment}},
-        array_filters=[{"elem.taskId": payload.taskId}]
-    )
+    pushed = await store.push_comment(payload.userId, payload.taskId, new_comment)
     
-    if result.modified_count == 0:
+    if not pushed:
         raise HTTPException(
             status_code=500, 
             detail="Failed to save comment"
@@ -333,6 +613,7 @@ async def update_task_completion_status(request: Request, payload: dict = Body(.
     - isCompleted: bool (required) - The completion status (true for completed, false for pending)
     """
     db = request.app.state.db
+    store = get_assignment_store(db)
     
     user_id = payload.get("userId")
     task_id = payload.get("taskId")
@@ -348,34 +629,127 @@ async def update_task_completion_status(request: Request, payload: dict = Body(.
     if is_completed is None:
         raise HTTPException(status_code=400, detail="isCompleted is required")
     
-    # Verify user assignment exists
-    assignment = await db.assignments.find_one({"userId": user_id})
-    if not assignment:
-        raise HTTPException(status_code=404, detail="No assignments found for this user")
+    # Update the task completion status; the filter doubles as the existence check
+    changed = await store.set_completion(user_id, task_id, is_completed)
     
-    # Verify task exists in user's assignments
-    task_found = any(task.get("taskId") == task_id for task in assignment.get("tasks", []))
-    if not task_found:
+    if changed is None:
+        if not await store.has_user(user_id):
+            raise HTTPException(status_code=404, detail="No assignments found for this user")
+
         raise HTTPException(
             status_code=404, 
             detail=f"Task {task_id} not found in user's assignments"
         )
     
-    # Update the task completion status
-    result = await db.assignments.update_one(
-        {"userId": user_id},
-        {"$set": {"tasks.$[elem].isCompleted": is_completed}},
-        array_filters=[{"elem.taskId": task_id}]
-    )
+    if changed:
+        await record_assignment_change(db, user_id, completed=1 if is_completed else -1)
     
-    if result.modified_count == 0:
+    return {
+        "status": "success",
+        "message": f"Task completion status updated to {'completed' if is_completed else 'pending'}",
+        "isCompleted": is_completed
+    }
+
+
+@router.post("/user-tasks/batch", status_code=200)
+async def batch_update_user_tasks(request: Request, payload: AssignmentBatchRequest = Body(...)):
+    """
+    Apply a list of assignment changes for one or more users in one bulk write.
+    
+    Supported operations: complete, uncomplete, comment, set_sequence, remove.
+    set_sequence moves the task like rearrange-user-tasks, so tasks set in
+    one batch are placed together among the user's other tasks.
+    Operations on the same user and task are merged in request order, so a
+    replayed offline queue lands in the same state as individual requests.
+    Returns one result per operation with status ok, invalid or not_found.
+    Removing a task that is not assigned is reported as ok.
+    """
+    db = request.app.state.db
+    store = get_assignment_store(db)
+    
+    operations = payload.operations
+    if not operations:
+        raise HTTPException(status_code=400, detail="operations array is required")
+    
+    if len(operations) > MAX_BATCH_OPERATIONS:
         raise HTTPException(
-            status_code=500, 
-            detail="Failed to update task completion status"
+            status_code=400,
+            detail=f"At most {MAX_BATCH_OPERATIONS} operations per batch"
+        )
+    
+    results = [
+        {"index": i, "op": op.op, "userId": op.userId, "taskId": op.taskId, "status": "ok"}
+        for i, op in enumerate(operations)
+    ]
+    
+    # Merge operations per (userId, taskId) so each pair is one write
+    changes = {}
+    change_indexes = {}
+    for i, op in enumerate(operations):
+        if op.op == "comment" and not (op.comment and op.comment.strip()):
+            results[i].update(status="invalid", detail="comment cannot be empty")
+            continue
+        if op.op == "set_sequence" and op.sequenceId is None:
+            results[i].update(status="invalid", detail="sequenceId is required")
+            continue
+        
+        key = (op.userId, op.taskId)
+        change = changes.setdefault(
+            key, {"userId": op.userId, "taskId": op.taskId, "set": {}, "comments": []}
+        )
+        change_indexes.setdefault(key, []).append(i)
+        
+        if change.get("remove"):
+            results[i].update(status="not_found", detail="Task was removed earlier in this batch")
+            change_indexes[key].remove(i)
+        elif op.op == "remove":
+            change.update(remove=True, set={}, comments=[])
+        elif op.op in ("complete", "uncomplete"):
+            change["set"]["isCompleted"] = op.op == "complete"
+        elif op.op == "set_sequence":
+            change["set"]["sequenceId"] = op.sequenceId
+        else:
+            change["comments"].append({
+                "comment": op.comment.strip(),
+                "commentBy": op.commentBy,
+                "createdAt": datetime.now()
+            })
+    
+    # Lists are ordered by rank: place re-sequenced tasks like rearrange-user-tasks does
+    resequenced = {}
+    for (user_id, task_id), change in changes.items():
+        if "sequenceId" in change["set"]:
+            resequenced.setdefault(user_id, []).append(
+                {"taskId": task_id, "sequenceId": change["set"]["sequenceId"]}
+            )
+    for user_id, ordered in resequenced.items():
+        ordered.sort(key=lambda t: t["sequenceId"])
+        for task_id, fields in (await _sequence_ranks(db, store, user_id, ordered)).items():
+            changes[(user_id, task_id)]["set"].update(fields)
+    
+    matched = await store.bulk_write_changes(list(changes.values()))
+    
+    # Only look up which pairs exist when some writes did not match
+    if matched < len(changes):
+        existing = await store.existing_pairs(
+            key for key, change in changes.items() if not change.get("remove")
         )
+        for key, change in changes.items():
+            if change.get("remove") or key in existing:
+                continue
+            for i in change_indexes[key]:
+                results[i].update(status="not_found", detail="Task not found in user's assignments")
+    
+    # Completion and removal deltas are not known per pair; recount affected users
+    affected_users = {
+        user_id for (user_id, _), change in changes.items()
+        if change.get("remove") or "isCompleted" in change["set"]
+    }
+    if affected_users:
+        await reconcile_user_stats(db, list(affected_users))
     
     return {
         "status": "success",
-        "message": f"Task completion status updated to {'completed' if is_completed else 'pending'}",
-        "isCompleted": is_completed
-    }
\ No newline at end of file
+        "applied": sum(1 for r in results if r["status"] == "ok"),
+        "results": results
+    }
@@ -0,0 +1,21 @@
+"""
+Shared fixtures. Tests run against mongomock-motor, an in-memory stand-in
+for Motor, so no MongoDB server is needed; test_api.py remains the
+end-to-end check against a running API.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["test"]
+
+
+@pytest.fixture
+def request_for(db):
+    """Stand-in for the FastAPI Request the routers read `app.state.db` from."""
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(db=db)))
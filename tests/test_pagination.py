@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from utils.pagination import (
+    DEFAULT_PAGE_SIZE, PageParams, decode_cursor, encode_cursor, fetch_page, keyset_filter
+)
+
+BASE = datetime(2026, 1, 1)
+
+
+def test_cursor_round_trip_keeps_bson_types():
+    values = [BASE, ObjectId(), None, "rank", 3]
+    token = encode_cursor(values)
+    assert "=" not in token and "/" not in token and "+" not in token
+    assert decode_cursor(token) == values
+
+
+@pytest.mark.parametrize("token", ["not a cursor", encode_cursor([1])[:-3] + "!!", "eyJhIjogMX0"])
+def test_decode_rejects_malformed_cursors(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_page_params_defaults():
+    assert PageParams(limit=None, after=None).limit is None
+    # A cursor without a limit still pages
+    assert PageParams(limit=None, after=encode_cursor([1])).limit == DEFAULT_PAGE_SIZE
+    with pytest.raises(HTTPException) as error:
+        PageParams(limit=10, after="garbage")
+    assert error.value.status_code == 400
+
+
+def test_keyset_filter_rejects_mismatched_cursor():
+    with pytest.raises(ValueError):
+        keyset_filter([("a", 1), ("_id", 1)], [1])
+
+
+async def seed(db, values):
+    """Documents with `value` from `values` (None = null, ... = field missing)."""
+    docs = []
+    for i, value in enumerate(values):
+        doc = {"_id": ObjectId.from_datetime(BASE + timedelta(seconds=i)), "i": i}
+        if value is not ...:
+            doc["value"] = value
+        docs.append(doc)
+    await db.items.insert_many(docs)
+
+
+async def walk(db, sort, limit):
+    """Every page in order, following the cursors."""
+    seen, after = [], None
+    while True:
+        page = PageParams(limit=limit, after=after)
+        docs, after = await fetch_page(db.items, {}, sort, page)
+        assert len(docs) <= limit
+        seen += [doc["i"] for doc in docs]
+        if after is None:
+            return seen
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+@pytest.mark.parametrize("limit", [1, 2, 3, 10])
+async def test_pages_cover_every_document_once_in_sort_order(db, direction, limit):
+    # Ties on `value`, and nulls/missing values, which sort first ascending and last descending
+    await seed(db, [3, None, 1, 3, ..., 2, None, 1, 3])
+    sort = [("value", direction), ("_id", direction)]
+
+    expected = [1, 4, 6, 2, 7, 5, 0, 3, 8]
+    if direction == -1:
+        expected.reverse()
+    assert [doc["i"] async for doc in db.items.find({}).sort(sort)] == expected
+    assert await walk(db, sort, limit) == expected
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+async def test_pages_starting_at_a_null_key(db, direction):
+    await seed(db, [None, None, 5, 6])
+    sort = [("value", direction), ("_id", direction)]
+    expected = [doc["i"] async for doc in db.items.find({}).sort(sort)]
+    assert await walk(db, sort, 1) == expected
+
+
+async def test_cursor_past_a_removed_document_resumes_after_it(db):
+    await seed(db, [1, 2, 3, 4])
+    sort = [("value", 1), ("_id", 1)]
+    docs, after = await fetch_page(db.items, {}, sort, PageParams(limit=2, after=None))
+    assert [doc["i"] for doc in docs] == [0, 1]
+
+    await db.items.delete_one({"i": 1})
+    docs, after = await fetch_page(db.items, {}, sort, PageParams(limit=2, after=after))
+    assert [doc["i"] for doc in docs] == [2, 3]
+    assert after is None
+
+
+async def test_without_limit_returns_everything(db):
+    await seed(db, [1, 2, 3])
+    docs, after = await fetch_page(db.items, {}, [("_id", 1)], PageParams(limit=None, after=None))
+    assert [doc["i"] for doc in docs] == [0, 1, 2]
+    assert after is None
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from utils.ranking import (
+    DIGITS, SEQUENCE_WIDTH, allocate_sequence, rank_between, rank_for_sequence, ranks_between
+)
+
+
+def test_sequence_ranks_sort_in_counter_order():
+    sequences = [0, 1, 2, 61, 62, 63, 3843, 3844, 10 ** 6]
+    ranks = [rank_for_sequence(seq) for seq in sequences]
+    assert ranks == sorted(ranks)
+    assert len(set(len(rank) for rank in ranks)) == 1
+    assert all(not rank.endswith(DIGITS[0]) for rank in ranks)
+
+
+def test_sequence_rank_width_is_bounded():
+    with pytest.raises(ValueError):
+        rank_for_sequence(len(DIGITS) ** SEQUENCE_WIDTH)
+
+
+@pytest.mark.parametrize("before, after", [
+    (None, None),
+    (None, rank_for_sequence(1)),
+    (rank_for_sequence(1), None),
+    (rank_for_sequence(1), rank_for_sequence(2)),
+    # adjacent digits force a longer key
+    ("1", "2"),
+    ("1V", "1W"),
+    ("z", None),
+    (None, "01"),
+])
+def test_rank_between_sorts_strictly_between(before, after):
+    rank = rank_between(before, after)
+    assert before is None or before < rank
+    assert after is None or rank < after
+    assert not rank.endswith(DIGITS[0])
+
+
+@pytest.mark.parametrize("before, after", [("b", "b"), ("c", "b")])
+def test_rank_between_rejects_unordered_bounds(before, after):
+    with pytest.raises(ValueError):
+        rank_between(before, after)
+
+
+def test_repeated_inserts_at_one_spot_stay_ordered():
+    # Always inserting right after the first key, or at the very top
+    first, last = rank_for_sequence(1), rank_for_sequence(2)
+    after_first = []
+    upper = last
+    for _ in range(200):
+        upper = rank_between(first, upper)
+        after_first.append(upper)
+    assert after_first == sorted(after_first, reverse=True)
+    assert first < after_first[-1] and after_first[0] < last
+
+    top = []
+    lower = first
+    for _ in range(200):
+        lower = rank_between(None, lower)
+        top.append(lower)
+    assert top == sorted(top, reverse=True)
+
+
+def test_random_moves_keep_a_total_order():
+    rng = random.Random(7)
+    ranks = [rank_for_sequence(seq) for seq in range(1, 21)]
+    for _ in range(500):
+        ranks.pop(rng.randrange(len(ranks)))
+        position = rng.randrange(len(ranks) + 1)
+        before = ranks[position - 1] if position else None
+        after = ranks[position] if position < len(ranks) else None
+        ranks.insert(position, rank_between(before, after))
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == len(ranks)
+
+
+@pytest.mark.parametrize("before, after", [(None, None), ("1", "2"), (rank_for_sequence(5), None)])
+@pytest.mark.parametrize("count", [0, 1, 2, 7, 100])
+def test_ranks_between_fills_a_gap_in_order(before, after, count):
+    ranks = ranks_between(before, after, count)
+    assert len(ranks) == count
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == count
+    assert all((before is None or before < rank) and (after is None or rank < after) for rank in ranks)
+
+
+def test_ranks_between_keys_grow_logarithmically():
+    ranks = ranks_between("1", "2", 1000)
+    assert max(len(rank) for rank in ranks) <= 6
+
+
+async def test_allocate_sequence_reserves_consecutive_blocks(db):
+    assert await allocate_sequence(db, "u1") == 1
+    assert await allocate_sequence(db, "u1", 5) == 6
+    assert await allocate_sequence(db, "u2") == 1
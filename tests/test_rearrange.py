@@ -0,0 +1,173 @@
+"""
+Task reordering in routers/tasks.py. Runs on the normalized layout: the
+rank logic is shared by all layouts, and mongomock does not implement the
+array filters the embedded layout writes with.
+"""
+
+import pytest
+from fastapi import HTTPException
+
+from routers import tasks as tasks_router
+from utils.assignment_store import get_assignment_store
+from utils.ranking import allocate_sequence, rank_for_sequence
+
+USER = "user_1"
+
+
+@pytest.fixture
+def store(db, monkeypatch):
+    monkeypatch.setenv("ASSIGNMENTS_LAYOUT", "normalized")
+    return get_assignment_store(db)
+
+
+async def seed(db, task_ids, ranked=True):
+    """Assign `task_ids` in this order, as link_user_to_task would (or unranked, as legacy data)."""
+    assignments = []
+    for task_id in task_ids:
+        sequence_id = await allocate_sequence(db, USER)
+        assignment = {"taskId": task_id, "assignedBy": "admin", "sequenceId": sequence_id,
+                      "isCompleted": False, "comments": []}
+        if ranked:
+            assignment["rank"] = rank_for_sequence(sequence_id)
+        assignments.append(assignment)
+    await db.task_assignments.insert_many([{"userId": USER, **a} for a in assignments])
+
+
+async def order(store):
+    return [t["taskId"] for t in await store.list_tasks(USER)]
+
+
+async def rearrange(request, tasks):
+    await tasks_router.rearrange_user_tasks(request, {"userId": USER, "tasks": tasks})
+
+
+async def test_full_list_sets_the_given_order(db, store, request_for):
+    await seed(db, ["a", "b", "c", "d"])
+    await rearrange(request_for, [
+        {"taskId": "d", "sequenceId": 1}, {"taskId": "b", "sequenceId": 2},
+        {"taskId": "a", "sequenceId": 3}, {"taskId": "c", "sequenceId": 4},
+    ])
+    assert await order(store) == ["d", "b", "a", "c"]
+    assert {t["taskId"]: t["sequenceId"] for t in await store.list_tasks(USER)} == {
+        "d": 1, "b": 2, "a": 3, "c": 4
+    }
+
+
+async def test_partial_list_keeps_unlisted_tasks_in_place(db, store, request_for):
+    await seed(db, ["a", "b", "c", "d", "e"])
+    unlisted_ranks = {t["taskId"]: t["rank"] for t in await store.list_tasks(USER) if t["taskId"] != "e"}
+
+    # e goes ahead of b, which holds sequenceId 2 now
+    await rearrange(request_for, [{"taskId": "e", "sequenceId": 2}])
+
+    assert await order(store) == ["a", "e", "b", "c", "d"]
+    after = {t["taskId"]: t["rank"] for t in await store.list_tasks(USER)}
+    assert all(after[task_id] == rank for task_id, rank in unlisted_ranks.items())
+
+
+async def test_several_tasks_in_one_gap_keep_their_relative_order(db, store, request_for):
+    await seed(db, ["a", "b", "c", "d", "e"])
+    await rearrange(request_for, [
+        {"taskId": "e", "sequenceId": 1}, {"taskId": "d", "sequenceId": 1},
+        {"taskId": "c", "sequenceId": 1},
+    ])
+    assert await order(store) == ["e", "d", "c", "a", "b"]
+
+
+async def test_moving_past_the_end_keeps_later_appends_last(db, store, request_for):
+    await seed(db, ["a", "b", "c"])
+    await rearrange(request_for, [{"taskId": "a", "sequenceId": 99}])
+    assert await order(store) == ["b", "c", "a"]
+
+    # The end took counter ranks, so a new assignment still lands after it
+    sequence_id = await allocate_sequence(db, USER)
+    await store.add_task(USER, {"taskId": "z", "sequenceId": sequence_id,
+                                "rank": rank_for_sequence(sequence_id)})
+    assert await order(store) == ["b", "c", "a", "z"]
+
+
+@pytest.mark.parametrize("move, expected", [
+    ({"taskId": "d", "afterTaskId": "a", "beforeTaskId": "b"}, ["a", "d", "b", "c"]),
+    ({"taskId": "c", "beforeTaskId": "a"}, ["c", "a", "b", "d"]),
+    # only afterTaskId: right after it, not at the end
+    ({"taskId": "d", "afterTaskId": "a"}, ["a", "d", "b", "c"]),
+    ({"taskId": "a", "afterTaskId": "d"}, ["b", "c", "d", "a"]),
+    ({"taskId": "a"}, ["b", "c", "d", "a"]),
+])
+async def test_move_one_task(db, store, move, expected):
+    await seed(db, ["a", "b", "c", "d"])
+    others = {t["taskId"]: t["rank"] for t in await store.list_tasks(USER) if t["taskId"] != move["taskId"]}
+
+    response = await tasks_router._move_user_task(db, store, USER, dict(move))
+
+    assert await order(store) == expected
+    after = {t["taskId"]: t["rank"] for t in await store.list_tasks(USER)}
+    assert after[move["taskId"]] == response["rank"]
+    assert all(after[task_id] == rank for task_id, rank in others.items())
+
+
+async def test_repeated_moves_to_the_same_spot(db, store):
+    await seed(db, ["a", "b", "c", "d", "e"])
+    for task_id in ["c", "d", "e", "c", "d"] * 10:
+        listed = await order(store)
+        listed.remove(task_id)
+        await tasks_router._move_user_task(
+            db, store, USER, {"taskId": task_id, "afterTaskId": "a", "beforeTaskId": listed[1]}
+        )
+        listed = await order(store)
+        assert listed.index("a") + 1 == listed.index(task_id)
+    assert await order(store) == ["a", "d", "c", "e", "b"]
+
+
+async def test_move_rejects_inverted_neighbours(db, store):
+    await seed(db, ["a", "b", "c"])
+    with pytest.raises(HTTPException) as error:
+        await tasks_router._move_user_task(
+            db, store, USER, {"taskId": "b", "afterTaskId": "c", "beforeTaskId": "a"}
+        )
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("move", [{"taskId": "x"}, {"taskId": "a", "afterTaskId": "x"}])
+async def test_move_unknown_task_is_404(db, store, move):
+    await seed(db, ["a", "b"])
+    with pytest.raises(HTTPException) as error:
+        await tasks_router._move_user_task(db, store, USER, move)
+    assert error.value.status_code == 404
+
+
+async def test_backfill_ranks_keeps_the_stored_order(db, store):
+    await seed(db, ["a", "b", "c"], ranked=False)
+    await tasks_router._backfill_ranks(db, store, USER)
+
+    listed = await store.list_tasks(USER)
+    assert [t["taskId"] for t in listed] == ["a", "b", "c"]
+    ranks = [t["rank"] for t in listed]
+    assert all(ranks) and ranks == sorted(ranks) and len(set(ranks)) == 3
+
+
+@pytest.mark.parametrize("move, expected", [
+    ({"taskId": "c", "afterTaskId": "a", "beforeTaskId": "b"}, ["a", "c", "b"]),
+    ({"taskId": "a", "afterTaskId": "b"}, ["b", "a", "c"]),
+])
+async def test_moves_on_legacy_lists_backfill_first(db, store, move, expected):
+    await seed(db, ["a", "b", "c"], ranked=False)
+    await tasks_router._move_user_task(db, store, USER, move)
+    assert await order(store) == expected
+    assert all(t.get("rank") for t in await store.list_tasks(USER))
+
+
+async def test_rearrange_on_legacy_list_backfills_first(db, store, request_for):
+    await seed(db, ["a", "b", "c"], ranked=False)
+    await rearrange(request_for, [{"taskId": "c", "sequenceId": 1}])
+    assert await order(store) == ["c", "a", "b"]
+
+
+async def test_put_sequence_id_moves_the_task(db, store, request_for):
+    await seed(db, ["a", "b", "c"])
+    await tasks_router.update_user_task_assignment(request_for, USER, "c", sequenceId=1)
+    assert await order(store) == ["c", "a", "b"]
+
+    with pytest.raises(HTTPException) as error:
+        await tasks_router.update_user_task_assignment(request_for, USER, "x", sequenceId=1)
+    assert error.value.status_code == 404
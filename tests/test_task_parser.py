@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from utils.task_parser import TaskStreamParser, parse_tasks
+
+REPLIES = [
+    "1. Learn Python basics\n2. Build a REST API with FastAPI\n3. Add MongoDB persistence\n",
+    "Here is your path:\n\n1) Set up the environment\n2) Write unit tests\n3) Deploy\n4) Monitor\n\nGood luck!",
+    # no trailing newline on the last task
+    "1. First task\n2. Second task\n3. Third task",
+    # items on one line: a single numbered line is not a list
+    "1. Alpha 2. Beta 3. Gamma",
+    # conversational, with a short numbered aside
+    "Great question! Two things matter most:\n1. Consistency\n2. Projects\nWhat are you working on?",
+    "No tasks here, just advice about careers in data science.",
+    "",
+    "10. Tenth\n11. Eleventh\n12. Twelfth\n  13.   Padded   \n",
+    "1. Only line with digits 2024 in it\n\n\n2. Blank lines between\n\n3. Still a list\n",
+]
+
+
+def stream(reply, boundaries):
+    """Tasks released while feeding `reply` cut at `boundaries`, plus the parser."""
+    parser = TaskStreamParser()
+    released = []
+    cuts = [0, *sorted(boundaries), len(reply)]
+    for start, end in zip(cuts, cuts[1:]):
+        released += parser.feed(reply[start:end])
+    released += parser.close()
+    return released, parser
+
+
+@pytest.mark.parametrize("reply", REPLIES)
+def test_every_single_split_matches_parse_tasks(reply):
+    expected = parse_tasks(reply)
+    for cut in range(len(reply) + 1):
+        released, parser = stream(reply, [cut])
+        assert released == expected, f"split at {cut}"
+        assert (parser.tasks if parser.is_task_list else []) == expected
+
+
+@pytest.mark.parametrize("reply", REPLIES)
+def test_random_chunking_matches_parse_tasks(reply):
+    rng = random.Random(reply)
+    expected = parse_tasks(reply)
+    for _ in range(200):
+        boundaries = [rng.randint(0, len(reply)) for _ in range(rng.randint(0, len(reply) or 1))]
+        released, _ = stream(reply, boundaries)
+        assert released == expected, f"boundaries {sorted(boundaries)}"
+
+
+def test_character_by_character():
+    reply = REPLIES[1]
+    released, _ = stream(reply, range(len(reply)))
+    assert released == parse_tasks(reply)
+
+
+def test_parse_tasks_results():
+    assert [t["name"] for t in parse_tasks(REPLIES[0])] == [
+        "Learn Python basics", "Build a REST API with FastAPI", "Add MongoDB persistence"
+    ]
+    assert [t["taskId"] for t in parse_tasks(REPLIES[7])] == [
+        "suggested_task_10", "suggested_task_11", "suggested_task_12", "suggested_task_13"
+    ]
+    assert parse_tasks(REPLIES[3]) == []
+    assert parse_tasks(REPLIES[4]) == []
+    assert parse_tasks(REPLIES[5]) == []
+
+
+def test_tasks_are_held_back_until_the_reply_is_a_list():
+    parser = TaskStreamParser()
+    assert parser.feed("1. One\n") == []
+    assert parser.feed("2. Two\n") == []
+    assert [t["name"] for t in parser.feed("3. Three\n")] == ["One", "Two", "Three"]
+    assert [t["name"] for t in parser.feed("4. Four\n")] == ["Four"]
+    assert parser.close() == []
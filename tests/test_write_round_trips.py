@@ -0,0 +1,104 @@
+"""
+Write endpoints return the document they wrote instead of reading it back:
+each one issues exactly one call on the collection it writes.
+"""
+
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+
+from models import Goal, Project, Task, TaskUpdate
+from routers import chat, goals, projects, tasks
+
+
+class CountingCollection:
+    def __init__(self, collection, calls: Counter):
+        self._collection = collection
+        self._calls = calls
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*args, **kwargs):
+            self._calls[f"{name}.{self._collection.name}"] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    """Counts Motor calls as "<method>.<collection>", like /metrics counts commands."""
+
+    def __init__(self, db):
+        self._db = db
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        return CountingCollection(getattr(self._db, name), self.calls)
+
+    def __getitem__(self, name):
+        return CountingCollection(self._db[name], self.calls)
+
+    def on(self, collection: str) -> Counter:
+        return Counter({
+            call: n for call, n in self.calls.items() if call.endswith(f".{collection}")
+        })
+
+
+@pytest.fixture
+def counted(db):
+    return CountingDatabase(db)
+
+
+@pytest.fixture
+def request_counted(counted):
+    return SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(db=counted)))
+
+
+async def test_create_project(counted, request_counted):
+    project = await projects.create_new_project(request_counted, Project(name="Platform"))
+    assert project["name"] == "Platform" and project["id"]
+    assert counted.on("projects") == {"insert_one.projects": 1}
+
+
+async def test_create_task(counted, request_counted):
+    task = await tasks.create_task(request_counted, Task(project_id="p1", title="Set up FastAPI"))
+    assert task["title"] == "Set up FastAPI" and task["id"]
+    assert counted.on("tasks") == {"insert_one.tasks": 1}
+
+
+async def test_update_task(db, counted, request_counted):
+    result = await db.tasks.insert_one({"project_id": "p1", "title": "Old", "status": "pending"})
+    task_id = str(result.inserted_id)
+
+    task = await tasks.update_task_status(
+        request_counted, task_id, TaskUpdate(title="New", status="completed")
+    )
+    assert (task["title"], task["status"]) == ("New", "completed")
+    assert counted.on("tasks") == {"find_one_and_update.tasks": 1}
+    assert (await db.tasks.find_one({"_id": result.inserted_id}))["title"] == "New"
+
+
+async def test_set_user_goals(counted, request_counted):
+    goal = await goals.set_user_goals(request_counted, Goal(userId="u1", goals=["Learn Python"]))
+    assert goal["goals"] == ["Learn Python"]
+    assert counted.on("goals") == {"find_one_and_update.goals": 1}
+
+
+async def test_manage_goals_reports_created_then_updated(counted, request_counted):
+    body = goals.ManageGoalsRequest(userId="u1", goals="Learn Python")
+    first = await goals.manage_goals(request_counted, body)
+    second = await goals.manage_goals(request_counted, body)
+    assert "created" in first["message"] and "updated" in second["message"]
+    assert counted.on("goals") == {"find_one_and_update.goals": 2}
+
+
+async def test_manage_agent_reports_created_then_updated(counted, request_counted):
+    body = chat.ManageAgentRequest(userId="u1", agentName="Buddy")
+    first = await chat.manage_agent(request_counted, body)
+    second = await chat.manage_agent(request_counted, body)
+    assert "created" in first["message"] and "updated" in second["message"]
+    assert second["agent"]["agentName"] == "Buddy"
+    assert counted.on("agents") == {"find_one_and_update.agents": 2}
@@ -0,0 +1,134 @@
+"""
+Admin dashboard analytics across projects, tasks and assignments.
+
+Everything is computed by one aggregation: assignment rows are joined to
+their task, tasks and projects are pulled in with $unionWith, and a $facet
+splits the combined stream into the per-project summaries. Results are kept
+for ANALYTICS_TTL_SECONDS so repeated dashboard loads do not re-run it.
+"""
+
+from datetime import datetime
+
+from utils.assignment_store import get_assignment_store
+from utils.cache import AsyncCache
+
+ANALYTICS_TTL_SECONDS = 60
+TOP_COMMENTED_TASKS = 5
+
+analytics_cache = AsyncCache("analytics", maxsize=1, ttl=ANALYTICS_TTL_SECONDS)
+
+
+def _pipeline(store) -> list:
+    return [
+        *store.assignment_rows_stages(),
+        {"$lookup": {
+            "from": "tasks",
+            "let": {"taskOid": {"$convert": {"input": "$taskId", "to": "objectId", "onError": None, "onNull": None}}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$taskOid"]}}},
+                {"$project": {"_id": 0, "project_id": 1, "title": 1}}
+            ],
+            "as": "task"
+        }},
+        {"$unwind": "$task"},
+        {"$project": {
+            "kind": "assignment",
+            "projectId": "$task.project_id",
+            "title": "$task.title",
+            "userId": 1,
+            "taskId": 1,
+            "isCompleted": 1,
+            "commentCount": 1
+        }},
+        {"$unionWith": {"coll": "tasks", "pipeline": [
+            {"$project": {"_id": 0, "kind": "task", "projectId": "$project_id", "status": 1}}
+        ]}},
+        {"$unionWith": {"coll": "projects", "pipeline": [
+            {"$project": {"_id": 0, "kind": "project", "projectId": {"$toString": "$_id"}, "name": 1, "status": 1}}
+        ]}},
+        {"$facet": {
+            "projects": [
+                {"$match": {"kind": "project"}},
+                {"$project": {"_id": 0, "projectId": 1, "name": 1, "status": 1}}
+            ],
+            "statusCounts": [
+                {"$match": {"kind": "task"}},
+                {"$group": {"_id": {"projectId": "$projectId", "status": "$status"}, "count": {"$sum": 1}}}
+            ],
+            "completion": [
+                {"$match": {"kind": "assignment"}},
+                {"$group": {
+                    "_id": {"projectId": "$projectId", "userId": "$userId"},
+                    "assigned": {"$sum": 1},
+                    "completed": {"$sum": {"$cond": ["$isCompleted", 1, 0]}}
+                }},
+                {"$group": {
+                    "_id": "$_id.projectId",
+                    "usersAssigned": {"$sum": 1},
+                    "avgCompletionRate": {"$avg": {"$divide": ["$completed", "$assigned"]}}
+                }}
+            ],
+            "mostCommented": [
+                {"$match": {"kind": "assignment", "commentCount": {"$gt": 0}}},
+                {"$group": {
+                    "_id": {"projectId": "$projectId", "taskId": "$taskId"},
+                    "title": {"$first": "$title"},
+                    "comments": {"$sum": "$commentCount"}
+                }},
+                {"$sort": {"comments": -1}},
+                {"$group": {
+                    "_id": "$_id.projectId",
+                    "tasks": {"$push": {"taskId": "$_id.taskId", "title": "$title", "comments": "$comments"}}
+                }},
+                {"$project": {"tasks": {"$slice": ["$tasks", TOP_COMMENTED_TASKS]}}}
+            ]
+        }}
+    ]
+
+
+async def compute_project_analytics(db) -> dict:
+    """Run the analytics pipeline and shape one summary per project."""
+    store = get_assignment_store(db)
+    result = await store.collection.aggregate(_pipeline(store), allowDiskUse=True).to_list(length=1)
+    facets = result[0] if result else {}
+
+    summaries = {
+        p["projectId"]: {
+            "projectId": p["projectId"],
+            "name": p.get("name"),
+            "status": p.get("status"),
+            "totalTasks": 0,
+            "taskCounts": {},
+            "usersAssigned": 0,
+            "avgCompletionRate": 0.0,
+            "mostCommentedTasks": []
+        }
+        for p in facets.get("projects", [])
+    }
+
+    for row in facets.get("statusCounts", []):
+        summary = summaries.get(row["_id"].get("projectId"))
+        if summary:
+            status = row["_id"].get("status") or "unknown"
+            summary["taskCounts"][status] = row["count"]
+            summary["totalTasks"] += row["count"]
+
+    for row in facets.get("completion", []):
+        summary = summaries.get(row["_id"])
+        if summary:
+            summary["usersAssigned"] = row["usersAssigned"]
+            summary["avgCompletionRate"] = row["avgCompletionRate"] or 0.0
+
+    for row in facets.get("mostCommented", []):
+        summary = summaries.get(row["_id"])
+        if summary:
+            summary["mostCommentedTasks"] = row["tasks"]
+
+    return {"generatedAt": datetime.now(), "projects": list(summaries.values())}
+
+
+async def get_project_analytics(db, refresh: bool = False) -> dict:
+    """Cached analytics; concurrent callers share one pipeline run."""
+    if refresh:
+        analytics_cache.invalidate("projects")
+    return await analytics_cache.get_or_load("projects", lambda: compute_project_analytics(db))
@@ -0,0 +1,475 @@
+"""
+Storage layouts for user task assignments.
+
+- embedded:   one `assignments` document per user with a `tasks` array (legacy)
+- normalized: one `task_assignments` document per (userId, taskId)
+- dual:       reads from embedded, writes to both; used while
+              migrate_assignments.py copies existing data across
+
+The layout is picked with the ASSIGNMENTS_LAYOUT environment variable.
+"""
+
+import os
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+
+from utils.pagination import PageParams, encode_cursor, fetch_page
+
+ASSIGNMENT_FIELDS = ("taskId", "assignedBy", "sequenceId", "rank", "isCompleted", "comments")
+BULK_BATCH_SIZE = 1000
+
+
+def _rank_order(task_assignment: dict) -> str:
+    # Unranked (legacy) assignments sort first, in their stored order
+    return task_assignment.get("rank") or ""
+
+
+def _batches(operations: list) -> Iterable[list]:
+    for i in range(0, len(operations), BULK_BATCH_SIZE):
+        yield operations[i:i + BULK_BATCH_SIZE]
+
+
+def _append_missing_tasks(task_assignments: List[dict]) -> list:
+    """
+    Pipeline update that appends only the assignments whose taskId is not in
+    the array yet. $addToSet compares whole objects, so it lets through
+    duplicates that differ in any other field.
+    """
+    return [{"$set": {"tasks": {"$concatArrays": [
+        {"$ifNull": ["$tasks", []]},
+        {"$filter": {
+            "input": {"$literal": task_assignments},
+            "cond": {"$not": [{"$in": ["$$this.taskId", {"$ifNull": ["$tasks.taskId", []]}]}]}
+        }}
+    ]}}}]
+
+
+# Bulk changes are dicts of the form
+#   {"userId", "taskId", "set": {field: value}, "comments": [comment], "remove": bool}
+# with at most one change per (userId, taskId), so unordered execution is safe.
+
+
+class EmbeddedAssignmentStore:
+    """All of a user's assignments live in one `assignments.tasks` array."""
+
+    def __init__(self, db):
+        self.collection = db.assignments
+
+    async def list_tasks(self, user_id: str) -> List[dict]:
+        assignment = await self.collection.find_one({"userId": user_id})
+        if not assignment:
+            return []
+        return sorted(assignment.get("tasks", []), key=_rank_order)
+
+    async def list_tasks_page(self, user_id: str, page: PageParams) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of a user's assignments. The array is read whole anyway, so
+        the cursor is (rank, taskId) of the last item; if that task has been
+        removed meanwhile, the page resumes at the next higher rank.
+        """
+        tasks = await self.list_tasks(user_id)
+        if page.after is not None:
+            if len(page.after) != 2:
+                raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+            after_rank, after_task_id = page.after
+            position = next(
+                (i for i, t in enumerate(tasks) if t.get("taskId") == after_task_id), None
+            )
+            if position is None:
+                position = next(
+                    (i - 1 for i, t in enumerate(tasks) if _rank_order(t) > after_rank), len(tasks) - 1
+                )
+            tasks = tasks[position + 1:]
+        if page.limit is None or len(tasks) <= page.limit:
+            return tasks, None
+        tasks = tasks[:page.limit]
+        return tasks, encode_cursor([_rank_order(tasks[-1]), tasks[-1].get("taskId")])
+
+    async def has_user(self, user_id: str) -> bool:
+        return await self.collection.find_one({"userId": user_id}, {"_id": 1}) is not None
+
+    async def find_task(self, user_id: str, task_id: str) -> Optional[dict]:
+        assignment = await self.collection.find_one(
+            {"userId": user_id, "tasks.taskId": task_id},
+            {"tasks.$": 1}
+        )
+        if not assignment:
+            return None
+        return assignment["tasks"][0]
+
+    async def add_task(self, user_id: str, task_assignment: dict) -> bool:
+        result = await self.collection.update_one(
+            {"userId": user_id},
+            _append_missing_tasks([task_assignment]),
+            upsert=True
+        )
+        return result.modified_count > 0 or result.upserted_id is not None
+
+    async def bulk_add_tasks(self, assignments: Dict[str, List[dict]]) -> int:
+        """Append assignments for many users, one update per user; returns users changed."""
+        changed = 0
+        operations = [
+            UpdateOne({"userId": user_id}, _append_missing_tasks(task_assignments), upsert=True)
+            for user_id, task_assignments in assignments.items()
+        ]
+        for batch in _batches(operations):
+            result = await self.collection.bulk_write(batch, ordered=False)
+            changed += result.modified_count + result.upserted_count
+        return changed
+
+    async def set_fields(self, user_id: str, task_id: str, fields: dict) -> bool:
+        result = await self.collection.update_one(
+            {"userId": user_id},
+            {"$set": {f"tasks.$[elem].{k}": v for k, v in fields.items()}},
+            array_filters=[{"elem.taskId": task_id}]
+        )
+        return result.matched_count > 0
+
+    async def set_completion(self, user_id: str, task_id: str, is_completed: bool) -> Optional[bool]:
+        """True if the flag changed, False if it already had this value, None if not assigned."""
+        result = await self.collection.update_one(
+            {"userId": user_id, "tasks": {"$elemMatch": {"taskId": task_id, "isCompleted": {"$ne": is_completed}}}},
+            {"$set": {"tasks.$.isCompleted": is_completed}}
+        )
+        if result.modified_count:
+            return True
+        return False if await self.find_task(user_id, task_id) else None
+
+    async def bulk_set_fields(self, user_id: str, updates: Dict[str, dict]) -> bool:
+        """Apply per-task field updates in one atomic update of the user's document."""
+        set_fields = {}
+        array_filters = []
+        for i, (task_id, fields) in enumerate(updates.items()):
+            set_fields.update({f"tasks.$[t{i}].{k}": v for k, v in fields.items()})
+            array_filters.append({f"t{i}.taskId": task_id})
+
+        result = await self.collection.update_one(
+            {"userId": user_id},
+            {"$set": set_fields},
+            array_filters=array_filters
+        )
+        return result.matched_count > 0
+
+    async def push_comment(self, user_id: str, task_id: str, comment: dict) -> bool:
+        result = await self.collection.update_one(
+            {"userId": user_id},
+            {"$push": {"tasks.$[elem].comments": comment}},
+            array_filters=[{"elem.taskId": task_id}]
+        )
+        return result.modified_count > 0
+
+    async def remove_task(self, user_id: str, task_id: str) -> Optional[dict]:
+        """Remove an assignment and return it, or None if it was not assigned."""
+        before = await self.collection.find_one_and_update(
+            {"userId": user_id, "tasks.taskId": task_id},
+            {"$pull": {"tasks": {"taskId": task_id}}},
+            projection={"tasks": {"$elemMatch": {"taskId": task_id}}},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not before or not before.get("tasks"):
+            return None
+        return before["tasks"][0]
+
+    async def bulk_write_changes(self, changes: List[dict]) -> int:
+        """Apply changes in one unordered bulk write; returns how many matched."""
+        operations = []
+        for change in changes:
+            # Matching on tasks.taskId folds the existence check into the write
+            query = {"userId": change["userId"], "tasks.taskId": change["taskId"]}
+            if change.get("remove"):
+                operations.append(UpdateOne(query, {"$pull": {"tasks": {"taskId": change["taskId"]}}}))
+                continue
+            update = {}
+            if change.get("set"):
+                update["$set"] = {f"tasks.$.{k}": v for k, v in change["set"].items()}
+            if change.get("comments"):
+                update["$push"] = {"tasks.$.comments": {"$each": change["comments"]}}
+            operations.append(UpdateOne(query, update))
+
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.matched_count
+
+    async def existing_pairs(self, pairs: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        """Return which of the (userId, taskId) pairs are currently assigned."""
+        pairs = set(pairs)
+        user_ids = list({user_id for user_id, _ in pairs})
+        existing = set()
+        async for assignment in self.collection.find(
+            {"userId": {"$in": user_ids}}, {"userId": 1, "tasks.taskId": 1}
+        ):
+            for task in assignment.get("tasks", []):
+                existing.add((assignment["userId"], task.get("taskId")))
+        return existing & pairs
+
+    async def completion_summary(self, user_ids: Optional[List[str]] = None) -> AsyncIterator[dict]:
+        """Yield {userId, assigned, completed} computed server-side from the source data."""
+        pipeline = [{"$match": {"userId": {"$in": user_ids}}}] if user_ids is not None else []
+        pipeline.append({"$project": {
+            "_id": 0,
+            "userId": 1,
+            "assigned": {"$size": {"$ifNull": ["$tasks", []]}},
+            "completed": {"$size": {"$filter": {
+                "input": {"$ifNull": ["$tasks", []]},
+                "cond": {"$eq": ["$$this.isCompleted", True]}
+            }}}
+        }})
+        async for doc in self.collection.aggregate(pipeline):
+            yield doc
+
+    def assignment_rows_stages(self) -> List[dict]:
+        """Aggregation stages yielding one {userId, taskId, isCompleted, commentCount} row per assignment."""
+        return [
+            {"$unwind": "$tasks"},
+            {"$project": {
+                "_id": 0,
+                "userId": 1,
+                "taskId": "$tasks.taskId",
+                "isCompleted": {"$eq": ["$tasks.isCompleted", True]},
+                "commentCount": {"$size": {"$ifNull": ["$tasks.comments", []]}}
+            }}
+        ]
+
+
+class NormalizedAssignmentStore:
+    """One `task_assignments` document per (userId, taskId), unique-indexed."""
+
+    def __init__(self, db):
+        self.collection = db.task_assignments
+
+    async def list_tasks(self, user_id: str) -> List[dict]:
+        cursor = self.collection.find(
+            {"userId": user_id}, {"_id": 0, "userId": 0}
+        ).sort([("rank", 1), ("_id", 1)])
+        return [doc async for doc in cursor]
+
+    async def list_tasks_page(self, user_id: str, page: PageParams) -> Tuple[List[dict], Optional[str]]:
+        docs, next_cursor = await fetch_page(
+            self.collection, {"userId": user_id}, [("rank", 1), ("_id", 1)], page,
+            projection={"userId": 0}
+        )
+        for doc in docs:
+            doc.pop("_id", None)
+        return docs, next_cursor
+
+    async def has_user(self, user_id: str) -> bool:
+        return await self.collection.find_one({"userId": user_id}, {"_id": 1}) is not None
+
+    async def find_task(self, user_id: str, task_id: str) -> Optional[dict]:
+        return await self.collection.find_one(
+            {"userId": user_id, "taskId": task_id},
+            {"_id": 0, "userId": 0}
+        )
+
+    async def add_task(self, user_id: str, task_assignment: dict) -> bool:
+        result = await self.collection.update_one(
+            {"userId": user_id, "taskId": task_assignment["taskId"]},
+            {"$setOnInsert": {"userId": user_id, **task_assignment}},
+            upsert=True
+        )
+        return result.upserted_id is not None
+
+    async def bulk_add_tasks(self, assignments: Dict[str, List[dict]]) -> int:
+        """Upsert one document per (userId, taskId); returns assignments created."""
+        created = 0
+        operations = [
+            UpdateOne(
+                {"userId": user_id, "taskId": task_assignment["taskId"]},
+                {"$setOnInsert": {"userId": user_id, **task_assignment}},
+                upsert=True
+            )
+            for user_id, task_assignments in assignments.items()
+            for task_assignment in task_assignments
+        ]
+        for batch in _batches(operations):
+            result = await self.collection.bulk_write(batch, ordered=False)
+            created += result.upserted_count
+        return created
+
+    async def set_fields(self, user_id: str, task_id: str, fields: dict) -> bool:
+        result = await self.collection.update_one(
+            {"userId": user_id, "taskId": task_id},
+            {"$set": fields}
+        )
+        return result.matched_count > 0
+
+    async def set_completion(self, user_id: str, task_id: str, is_completed: bool) -> Optional[bool]:
+        """True if the flag changed, False if it already had this value, None if not assigned."""
+        result = await self.collection.update_one(
+            {"userId": user_id, "taskId": task_id},
+            {"$set": {"isCompleted": is_completed}}
+        )
+        if not result.matched_count:
+            return None
+        return result.modified_count > 0
+
+    async def bulk_set_fields(self, user_id: str, updates: Dict[str, dict]) -> bool:
+        """Apply per-task field updates as one unordered bulk write."""
+        result = await self.collection.bulk_write([
+            UpdateOne({"userId": user_id, "taskId": task_id}, {"$set": fields})
+            for task_id, fields in updates.items()
+        ], ordered=False)
+        return result.matched_count > 0
+
+    async def push_comment(self, user_id: str, task_id: str, comment: dict) -> bool:
+        result = await self.collection.update_one(
+            {"userId": user_id, "taskId": task_id},
+            {"$push": {"comments": comment}}
+        )
+        return result.modified_count > 0
+
+    async def remove_task(self, user_id: str, task_id: str) -> Optional[dict]:
+        """Remove an assignment and return it, or None if it was not assigned."""
+        return await self.collection.find_one_and_delete(
+            {"userId": user_id, "taskId": task_id},
+            projection={"_id": 0, "userId": 0}
+        )
+
+    async def bulk_write_changes(self, changes: List[dict]) -> int:
+        """Apply changes in one unordered bulk write; returns how many matched."""
+        operations = []
+        for change in changes:
+            query = {"userId": change["userId"], "taskId": change["taskId"]}
+            if change.get("remove"):
+                operations.append(DeleteOne(query))
+                continue
+            update = {}
+            if change.get("set"):
+                update["$set"] = change["set"]
+            if change.get("comments"):
+                update["$push"] = {"comments": {"$each": change["comments"]}}
+            operations.append(UpdateOne(query, update))
+
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.matched_count + result.deleted_count
+
+    async def existing_pairs(self, pairs: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        """Return which of the (userId, taskId) pairs are currently assigned."""
+        pairs = set(pairs)
+        if not pairs:
+            return set()
+        cursor = self.collection.find(
+            {"$or": [{"userId": user_id, "taskId": task_id} for user_id, task_id in pairs]},
+            {"_id": 0, "userId": 1, "taskId": 1}
+        )
+        return {(doc["userId"], doc["taskId"]) async for doc in cursor}
+
+    async def completion_summary(self, user_ids: Optional[List[str]] = None) -> AsyncIterator[dict]:
+        """Yield {userId, assigned, completed} computed server-side from the source data."""
+        pipeline = [{"$match": {"userId": {"$in": user_ids}}}] if user_ids is not None else []
+        pipeline += [
+            {"$group": {
+                "_id": "$userId",
+                "assigned": {"$sum": 1},
+                "completed": {"$sum": {"$cond": [{"$eq": ["$isCompleted", True]}, 1, 0]}}
+            }},
+            {"$project": {"_id": 0, "userId": "$_id", "assigned": 1, "completed": 1}}
+        ]
+        async for doc in self.collection.aggregate(pipeline):
+            yield doc
+
+    def assignment_rows_stages(self) -> List[dict]:
+        """Aggregation stages yielding one {userId, taskId, isCompleted, commentCount} row per assignment."""
+        return [
+            {"$project": {
+                "_id": 0,
+                "userId": 1,
+                "taskId": 1,
+                "isCompleted": {"$eq": ["$isCompleted", True]},
+                "commentCount": {"$size": {"$ifNull": ["$comments", []]}}
+            }}
+        ]
+
+
+class DualAssignmentStore:
+    """
+    Migration layout: the embedded store stays the source of truth for reads
+    and results, every write is mirrored into the normalized collection.
+    """
+
+    def __init__(self, db):
+        self.primary = EmbeddedAssignmentStore(db)
+        self.mirror = NormalizedAssignmentStore(db)
+        self.collection = self.primary.collection
+
+    async def list_tasks(self, user_id: str) -> List[dict]:
+        return await self.primary.list_tasks(user_id)
+
+    async def list_tasks_page(self, user_id: str, page: PageParams) -> Tuple[List[dict], Optional[str]]:
+        return await self.primary.list_tasks_page(user_id, page)
+
+    async def has_user(self, user_id: str) -> bool:
+        return await self.primary.has_user(user_id)
+
+    async def find_task(self, user_id: str, task_id: str) -> Optional[dict]:
+        return await self.primary.find_task(user_id, task_id)
+
+    async def add_task(self, user_id: str, task_assignment: dict) -> bool:
+        added = await self.primary.add_task(user_id, task_assignment)
+        await self.mirror.add_task(user_id, task_assignment)
+        return added
+
+    async def bulk_add_tasks(self, assignments: Dict[str, List[dict]]) -> int:
+        changed = await self.primary.bulk_add_tasks(assignments)
+        await self.mirror.bulk_add_tasks(assignments)
+        return changed
+
+    async def set_fields(self, user_id: str, task_id: str, fields: dict) -> bool:
+        matched = await self.primary.set_fields(user_id, task_id, fields)
+        await self.mirror.set_fields(user_id, task_id, fields)
+        return matched
+
+    async def set_completion(self, user_id: str, task_id: str, is_completed: bool) -> Optional[bool]:
+        changed = await self.primary.set_completion(user_id, task_id, is_completed)
+        await self.mirror.set_completion(user_id, task_id, is_completed)
+        return changed
+
+    async def bulk_set_fields(self, user_id: str, updates: Dict[str, dict]) -> bool:
+        matched = await self.primary.bulk_set_fields(user_id, updates)
+        await self.mirror.bulk_set_fields(user_id, updates)
+        return matched
+
+    async def push_comment(self, user_id: str, task_id: str, comment: dict) -> bool:
+        pushed = await self.primary.push_comment(user_id, task_id, comment)
+        await self.mirror.push_comment(user_id, task_id, comment)
+        return pushed
+
+    async def remove_task(self, user_id: str, task_id: str) -> Optional[dict]:
+        removed = await self.primary.remove_task(user_id, task_id)
+        await self.mirror.remove_task(user_id, task_id)
+        return removed
+
+    async def bulk_write_changes(self, changes: List[dict]) -> int:
+        matched = await self.primary.bulk_write_changes(changes)
+        await self.mirror.bulk_write_changes(changes)
+        return matched
+
+    async def existing_pairs(self, pairs: Iterable[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        return await self.primary.existing_pairs(pairs)
+
+    async def completion_summary(self, user_ids: Optional[List[str]] = None) -> AsyncIterator[dict]:
+        async for doc in self.primary.completion_summary(user_ids):
+            yield doc
+
+    def assignment_rows_stages(self) -> List[dict]:
+        return self.primary.assignment_rows_stages()
+
+
+LAYOUTS = {
+    "embedded": EmbeddedAssignmentStore,
+    "normalized": NormalizedAssignmentStore,
+    "dual": DualAssignmentStore,
+}
+
+
+def get_assignment_store(db):
+    """Return the assignment store for the configured ASSIGNMENTS_LAYOUT."""
+    layout = os.getenv("ASSIGNMENTS_LAYOUT", "embedded").strip().lower()
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown ASSIGNMENTS_LAYOUT: {layout}")
+    return LAYOUTS[layout](db)
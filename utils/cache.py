@@ -0,0 +1,133 @@
+"""
+Bounded in-process async cache (LRU + TTL) with single-flight fills.
+
+Concurrent misses for the same key share one loader call instead of each
+hitting Mongo. Every cache registers itself so /metrics can report hit,
+miss and eviction counts for sizing.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+CACHES: Dict[str, "AsyncCache"] = {}
+
+_MISSING = object()
+
+
+class AsyncCache:
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 300.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        # Bumped on every invalidation; a fill that started before an
+        # invalidation is returned to its callers but not stored
+        self.generation = 0
+        CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh cached value without loading; counts as a hit or miss."""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: int = None):
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, calling `loader` once on a miss."""
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        generation = self.generation
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not logged
+            future.exception()
+            raise
+        else:
+            self.set(key, value, generation)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def items(self) -> list:
+        """(key, value) pairs currently stored, without touching LRU order or counters."""
+        return [(key, value) for key, (_, value) in self._entries.items()]
+
+    def invalidate(self, *keys: Hashable):
+        self.generation += 1
+        for key in keys:
+            self._entries.pop(key, None)
+            self._inflight.pop(key, None)
+
+    def invalidate_prefix(self, prefix: str):
+        """Drop every string key starting with `prefix` (e.g. all pages of a list)."""
+        self.generation += 1
+        for key in [k for k in self._entries if isinstance(k, str) and k.startswith(prefix)]:
+            del self._entries[key]
+        for key in [k for k in self._inflight if isinstance(k, str) and k.startswith(prefix)]:
+            del self._inflight[key]
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+
+def cache_stats() -> Dict[str, dict]:
+    return {name: cache.stats() for name, cache in CACHES.items()}
@@ -0,0 +1,160 @@
+"""
+Cached reads of the project/task catalog.
+
+Projects and tasks change rarely but are read on almost every request, so
+reads go through a shared AsyncCache. Values are stored serialized (with
+`id` instead of `_id`) and callers receive shallow copies, so mutating a
+result never corrupts the cache. Only the fields of the Project and Task
+models are read, so results can be encoded as-is without response_model
+filtering them again. Writers must await the matching
+invalidate_* function after changing a project or task; it also publishes
+the invalidation to the other workers (see utils/coherence.py).
+
+Documents written outside the API may lack optional fields;
+serialize_project / serialize_task fill in the model defaults (as
+response_model validation used to), so every result has the full shape.
+"""
+
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from models import Project, Task
+from utils import coherence
+from utils.cache import AsyncCache
+from utils.helpers import serialize
+from utils.pagination import PageParams, encode_cursor, fetch_page
+
+catalog_cache = AsyncCache(
+    "catalog",
+    maxsize=int(os.getenv("CATALOG_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "300"))
+)
+
+PROJECT_FIELDS = {field: 1 for field in Project.model_fields if field != "id"}
+TASK_FIELDS = {field: 1 for field in Task.model_fields if field != "id"}
+
+
+def _optional_fields(model) -> dict:
+    return {
+        name: field for name, field in model.model_fields.items()
+        if name != "id" and not field.is_required()
+    }
+
+
+_PROJECT_OPTIONAL = _optional_fields(Project)
+_TASK_OPTIONAL = _optional_fields(Task)
+
+
+def _with_defaults(doc: Optional[dict], optional: dict) -> Optional[dict]:
+    doc = serialize(doc)
+    if doc:
+        for name, field in optional.items():
+            if name not in doc:
+                doc[name] = field.get_default(call_default_factory=True)
+    return doc
+
+
+def serialize_project(doc: Optional[dict]) -> Optional[dict]:
+    """serialize() plus Project defaults for missing optional fields."""
+    return _with_defaults(doc, _PROJECT_OPTIONAL)
+
+
+def serialize_task(doc: Optional[dict]) -> Optional[dict]:
+    """serialize() plus Task defaults for missing optional fields."""
+    return _with_defaults(doc, _TASK_OPTIONAL)
+
+coherence.register_scope("projects", catalog_cache, ["projects:", "project:"])
+coherence.register_scope("tasks", catalog_cache, ["task:", "project_tasks:"])
+
+
+def _page_key(page: PageParams) -> str:
+    after = encode_cursor(page.after) if page.after is not None else ""
+    return f"{page.limit}:{after}"
+
+
+async def list_projects(db, page: PageParams) -> Tuple[List[dict], Optional[str]]:
+    async def load():
+        docs, next_cursor = await fetch_page(
+            db.projects, {}, [("created_at", -1), ("_id", -1)], page, projection=PROJECT_FIELDS
+        )
+        return [serialize_project(doc) for doc in docs], next_cursor
+
+    projects, next_cursor = await catalog_cache.get_or_load(f"projects:{_page_key(page)}", load)
+    return [dict(p) for p in projects], next_cursor
+
+
+async def get_project(db, project_id: str) -> Optional[dict]:
+    if not ObjectId.is_valid(project_id):
+        return None
+
+    async def load():
+        return serialize_project(await db.projects.find_one({"_id": ObjectId(project_id)}, PROJECT_FIELDS))
+
+    project = await catalog_cache.get_or_load(f"project:{project_id}", load)
+    return dict(project) if project else None
+
+
+async def get_project_tasks(db, project_id: str, page: PageParams) -> Tuple[List[dict], Optional[str]]:
+    async def load():
+        docs, next_cursor = await fetch_page(
+            db.tasks, {"project_id": project_id}, [("_id", 1)], page, projection=TASK_FIELDS
+        )
+        return [serialize_task(doc) for doc in docs], next_cursor
+
+    tasks, next_cursor = await catalog_cache.get_or_load(
+        f"project_tasks:{project_id}:{_page_key(page)}", load
+    )
+    return [dict(t) for t in tasks], next_cursor
+
+
+async def _get_many(
+    db, collection: str, prefix: str, ids: Iterable[str], projection: dict, to_dict: Callable
+) -> Dict[str, dict]:
+    """Multi-get by id: serve what is cached, fetch the rest with one $in query."""
+    found = {}
+    missing = []
+    for doc_id in set(ids):
+        if not ObjectId.is_valid(doc_id):
+            continue
+        cached = catalog_cache.get(f"{prefix}:{doc_id}")
+        if cached is not None:
+            found[doc_id] = cached
+        else:
+            missing.append(ObjectId(doc_id))
+
+    if missing:
+        generation = catalog_cache.generation
+        async for doc in db[collection].find({"_id": {"$in": missing}}, projection):
+            doc = to_dict(doc)
+            catalog_cache.set(f"{prefix}:{doc['id']}", doc, generation)
+            found[doc["id"]] = doc
+
+    return {doc_id: dict(doc) for doc_id, doc in found.items()}
+
+
+async def get_tasks_by_ids(db, task_ids: Iterable[str]) -> Dict[str, dict]:
+    return await _get_many(db, "tasks", "task", task_ids, TASK_FIELDS, serialize_task)
+
+
+async def get_projects_by_ids(db, project_ids: Iterable[str]) -> Dict[str, dict]:
+    return await _get_many(db, "projects", "project", project_ids, PROJECT_FIELDS, serialize_project)
+
+
+async def invalidate_project(db, project_id: Optional[str] = None):
+    """After a project is created or changed."""
+    await coherence.publish(
+        db, "projects",
+        keys=[f"project:{project_id}"] if project_id else [],
+        prefixes=["projects:"]
+    )
+
+
+async def invalidate_tasks(db, project_ids: Iterable[str] = (), task_ids: Iterable[str] = ()):
+    """After tasks are created or changed."""
+    await coherence.publish(
+        db, "tasks",
+        keys=[f"task:{task_id}" for task_id in set(task_ids)],
+        prefixes=[f"project_tasks:{project_id}:" for project_id in set(project_ids)]
+    )
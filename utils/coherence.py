@@ -0,0 +1,142 @@
+"""
+Cross-worker invalidation for in-process caches.
+
+Each uvicorn worker has its own AsyncCache instances, so a write handled by
+one worker leaves the others serving stale entries. Writers publish what
+they invalidated to a version stamp in the `cache_versions` collection:
+
+    {_id: <scope>, v: <int>, recent: [{v, keys, prefixes}, ...]}
+
+`v` and the bounded `recent` log are updated in one single-document
+pipeline update, so they are always consistent. Every worker polls the
+stamps every COHERENCE_INTERVAL seconds (one small find) and replays the
+entries it has not seen yet. A worker that has fallen more than
+RECENT_LOG_SIZE versions behind, or cannot reach Mongo, drops the whole
+scope instead. Remote staleness is therefore bounded by the poll interval.
+Entries a worker published itself are skipped, since they were applied
+locally at publish time.
+
+Structures that are not AsyncCaches (e.g. the relevance index) can follow
+remote invalidations with add_listener.
+
+Plain find/update only: no change streams, so a standalone mongod works.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from pymongo import ReturnDocument
+
+from utils.cache import AsyncCache
+
+COHERENCE_INTERVAL = float(os.getenv("CACHE_COHERENCE_INTERVAL", "1"))
+RECENT_LOG_SIZE = 100
+
+# scope -> (cache, key prefixes covering everything the scope may hold)
+_scopes: Dict[str, Tuple[AsyncCache, Tuple[str, ...]]] = {}
+_seen: Dict[str, int] = {}
+# scope -> callbacks(keys, prefixes) run for invalidations from other workers
+_listeners: Dict[str, List[Callable[[List[str], List[str]], None]]] = {}
+# (scope, version) pairs published by this worker
+_own: Set[Tuple[str, int]] = set()
+
+
+def register_scope(scope: str, cache: AsyncCache, prefixes: Iterable[str]):
+    _scopes[scope] = (cache, tuple(prefixes))
+
+
+def add_listener(scope: str, callback: Callable[[List[str], List[str]], None]):
+    _listeners.setdefault(scope, []).append(callback)
+
+
+def _apply(scope: str, keys: Iterable[str] = (), prefixes: Iterable[str] = (), remote: bool = True):
+    keys, prefixes = list(keys), list(prefixes)
+    cache, _ = _scopes[scope]
+    for prefix in prefixes:
+        cache.invalidate_prefix(prefix)
+    cache.invalidate(*keys)
+    if remote:
+        for callback in _listeners.get(scope, []):
+            callback(keys, prefixes)
+
+
+def _drop_scope(scope: str):
+    _apply(scope, prefixes=_scopes[scope][1])
+
+
+async def publish(db, scope: str, keys: Iterable[str] = (), prefixes: Iterable[str] = ()):
+    """Invalidate locally and bump the scope's version so other workers follow."""
+    keys, prefixes = list(keys), list(prefixes)
+    _apply(scope, keys, prefixes, remote=False)
+    if not keys and not prefixes:
+        return
+
+    entry = {"keys": {"$literal": keys}, "prefixes": {"$literal": prefixes}}
+    try:
+        stamp = await db.cache_versions.find_one_and_update(
+            {"_id": scope},
+            [
+                {"$set": {"v": {"$add": [{"$ifNull": ["$v", 0]}, 1]}, "updatedAt": datetime.now()}},
+                {"$set": {"recent": {"$slice": [
+                    {"$concatArrays": [{"$ifNull": ["$recent", []]}, [{"v": "$v", **entry}]]},
+                    -RECENT_LOG_SIZE
+                ]}}}
+            ],
+            projection={"v": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        _own.add((scope, stamp["v"]))
+    except Exception as e:
+        # The write itself succeeded; other workers fall back to the cache TTL
+        print(f"⚠️ Could not publish cache invalidation for {scope}: {e}")
+
+
+async def poll(db):
+    """Replay invalidations published by other workers since the last poll."""
+    stamps: List[dict] = await db.cache_versions.find(
+        {"_id": {"$in": list(_scopes)}}
+    ).to_list(length=None)
+
+    first_poll = not _seen
+    if first_poll:
+        # A scope without a stamp yet is at version 0
+        _seen.update({scope: 0 for scope in _scopes})
+
+    for stamp in stamps:
+        scope, version = stamp["_id"], stamp.get("v", 0)
+        seen = _seen.get(scope, 0)
+        _seen[scope] = version
+        if first_poll or version <= seen:
+            # Nothing cached can predate the first poll
+            continue
+
+        missed = [e for e in stamp.get("recent", []) if e["v"] > seen]
+        if len(missed) < version - seen:
+            # Log no longer covers the gap
+            _drop_scope(scope)
+            continue
+        for entry in missed:
+            if (scope, entry["v"]) in _own:
+                continue
+            _apply(scope, entry.get("keys", []), entry.get("prefixes", []))
+
+    # Forget own versions once they are behind what has been polled
+    _own.intersection_update({(scope, v) for scope, v in _own if v > _seen.get(scope, 0)})
+
+
+async def run_poller(db, interval: float = COHERENCE_INTERVAL):
+    """Background task started from the app lifespan."""
+    while True:
+        try:
+            await poll(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Cannot tell what changed elsewhere; stop trusting local entries
+            print(f"⚠️ Cache coherence poll failed: {e}")
+            for scope in _scopes:
+                _drop_scope(scope)
+        await asyncio.sleep(interval)
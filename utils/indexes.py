@@ -0,0 +1,201 @@
+"""
+Every index the routers, stores and agent tools rely on, in one place.
+
+`ensure_indexes` runs from the app lifespan: it compares INDEXES with what
+exists and builds only the missing ones, so startup costs one
+listIndexes per collection once everything is in place. An existing index
+on a declared key but with different uniqueness, TTL or partial filter is
+reported as failed rather than rebuilt; drop it and restart to apply the
+declaration.
+`check_query_plans` explains each QUERY_SHAPES entry and reports any that
+would scan a whole collection; `python check_indexes.py --explain` runs it
+and exits non-zero on a COLLSCAN.
+
+When adding a query on a new field, declare its index here and add the
+query shape below.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "projects": [
+        # list_projects: newest first, keyset on (created_at, _id)
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "tasks": [
+        # project task lists (router, catalog, agent tools) and stats reconcile
+        IndexModel([("project_id", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "goals": [
+        IndexModel([("userId", ASCENDING)]),
+    ],
+    "agents": [
+        IndexModel([("userId", ASCENDING)]),
+    ],
+    "chats": [
+        # history pages sort on (timestamp, _id) within a user
+        IndexModel([("userId", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)]),
+        # one agent reply per job, however often the job runs
+        IndexModel([("jobId", ASCENDING)], unique=True, partialFilterExpression={"jobId": {"$exists": True}}),
+    ],
+    "assignments": [
+        # embedded layout: one document per user
+        IndexModel([("userId", ASCENDING)], unique=True),
+        # which users have a given task
+        IndexModel([("tasks.taskId", ASCENDING)]),
+    ],
+    "task_assignments": [
+        # normalized layout: one document per (userId, taskId)
+        IndexModel([("userId", ASCENDING), ("taskId", ASCENDING)], unique=True),
+        # a user's list in rank order, keyset on (rank, _id)
+        IndexModel([("userId", ASCENDING), ("rank", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "agent_jobs": [
+        # workers claim the oldest queued job, or a running one whose lease expired
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        # a user's pending runs, for rate limit admission
+        IndexModel([("userId", ASCENDING), ("status", ASCENDING)]),
+        # one queued or running job per identical request
+        IndexModel([("dedupKey", ASCENDING)], unique=True, partialFilterExpression={"active": True}),
+        # client idempotency keys, matched until the job expires
+        IndexModel(
+            [("idempotencyKey", ASCENDING)], unique=True,
+            partialFilterExpression={"idempotencyKey": {"$exists": True}}
+        ),
+        # finished jobs are deleted once past expires_at
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "llm_cache": [
+        # cached model replies are deleted once past their own expires_at
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+_SAMPLE_ID = ObjectId()
+
+# (collection, filter, sort) for the queries issued on request paths, with
+# placeholder values; the plan depends only on the shape
+QUERY_SHAPES: List[Tuple[str, dict, Optional[list]]] = [
+    ("projects", {}, [("created_at", -1), ("_id", -1)]),
+    ("projects", {"_id": {"$in": [_SAMPLE_ID]}}, None),
+    ("tasks", {"project_id": "sample"}, [("_id", 1)]),
+    ("tasks", {"_id": {"$in": [_SAMPLE_ID]}}, None),
+    ("goals", {"userId": "sample"}, None),
+    ("goals", {"userId": "sample"}, [("_id", 1)]),
+    ("agents", {"userId": "sample"}, None),
+    ("chats", {"userId": "sample"}, [("timestamp", 1), ("_id", 1)]),
+    ("chats", {"jobId": "sample"}, None),
+    ("assignments", {"userId": "sample"}, None),
+    ("assignments", {"userId": {"$in": ["sample"]}}, None),
+    ("assignments", {"userId": "sample", "tasks.taskId": "sample"}, None),
+    ("assignments", {"tasks.taskId": "sample"}, None),
+    ("task_assignments", {"userId": "sample"}, [("rank", 1), ("_id", 1)]),
+    ("task_assignments", {"userId": "sample", "taskId": "sample"}, None),
+    ("task_assignments", {"userId": {"$in": ["sample"]}}, None),
+    ("agent_jobs", {"status": "queued"}, [("created_at", 1)]),
+    ("agent_jobs", {"userId": "sample", "status": {"$in": ["queued", "running"]}}, None),
+    ("agent_jobs", {"dedupKey": "sample", "active": True}, None),
+    ("agent_jobs", {"idempotencyKey": "sample"}, None),
+    ("agent_jobs", {"status": "running", "lease_until": {"$lt": datetime.now()}, "attempts": {"$lt": 3}},
+     [("created_at", 1)]),
+]
+
+
+# Index options that change what the index enforces; compared on existing indexes
+_OPTIONS = ("unique", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _plain(value):
+    # index_information returns SON; compare as plain dicts
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _options(info: dict) -> dict:
+    options = {option: _plain(info.get(option)) for option in _OPTIONS}
+    options["unique"] = bool(options["unique"])
+    return options
+
+
+def _key(spec) -> Tuple[Tuple[str, int], ...]:
+    # Servers may report directions as floats; special types ("text") stay strings
+    return tuple(
+        (field, int(direction) if isinstance(direction, (int, float)) else direction)
+        for field, direction in spec
+    )
+
+
+async def ensure_indexes(db) -> Dict[str, list]:
+    """
+    Build declared indexes that do not exist yet. Returns a report with the
+    indexes created, failed (e.g. a unique index over duplicate data, or an
+    existing index whose options differ from the declaration) and found on
+    the collections without being declared here.
+    """
+    report = {"created": [], "failed": [], "unmanaged": []}
+
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        existing_keys = {_key(info["key"]): name for name, info in existing.items()}
+        declared_keys = set()
+
+        for model in models:
+            key = _key(model.document["key"].items())
+            declared_keys.add(key)
+            if key in existing_keys:
+                name = existing_keys[key]
+                found, declared = _options(existing[name]), _options(model.document)
+                if found != declared:
+                    differences = ", ".join(
+                        f"{option}={found[option]!r} (declared {declared[option]!r})"
+                        for option in _OPTIONS if found[option] != declared[option]
+                    )
+                    report["failed"].append(f"{collection}.{name}: exists with {differences}")
+                continue
+            try:
+                name = await db[collection].create_indexes([model])
+                report["created"].append(f"{collection}.{name[0]}")
+            except OperationFailure as e:
+                report["failed"].append(f"{collection}.{model.document['name']}: {e}")
+
+        report["unmanaged"] += [
+            f"{collection}.{name}" for key, name in existing_keys.items()
+            if key not in declared_keys and name != "_id_"
+        ]
+
+    return report
+
+
+def _stages(plan) -> List[str]:
+    """Every stage name in an explain plan tree (classic and SBE formats)."""
+    if isinstance(plan, list):
+        return [stage for child in plan for stage in _stages(child)]
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    for value in plan.values():
+        if isinstance(value, (dict, list)):
+            stages += _stages(value)
+    return stages
+
+
+async def check_query_plans(db) -> List[str]:
+    """Explain every QUERY_SHAPES entry; returns descriptions of the ones that COLLSCAN."""
+    problems = []
+    for collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning = explain.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _stages(winning):
+            problems.append(f"{collection}.find({query}) sort={sort}")
+    return problems
@@ -0,0 +1,324 @@
+"""
+Mongo-backed job queue with a bounded pool of async workers.
+
+Slow work (agent runs) is enqueued as a document in `agent_jobs`
+
+    {_id, kind, userId, payload, status, attempts, result, error,
+     created_at, started_at, finished_at, lease_until, expires_at}
+
+and executed by AGENT_WORKERS worker tasks per process, so a burst of
+requests waits in the queue instead of opening hundreds of model calls at
+once. Workers claim jobs with a single find_one_and_update (oldest queued
+first), so several processes can share the queue.
+
+A claimed job holds a lease of JOB_LEASE seconds, renewed by a heartbeat
+while its handler runs, so slow runs (waiting on the rate limiter or the
+model) are not claimed twice. Jobs whose lease ran out (the process died
+or hung mid-run) are claimed again, up to MAX_ATTEMPTS attempts in all;
+after that they are marked failed.
+Jobs interrupted by a clean shutdown go straight back to the queue.
+Finished jobs are kept for JOB_RETENTION seconds (TTL index on
+`expires_at`, see utils/indexes.py).
+
+Duplicate requests share one job. A job enqueued with a `dedup_key` is
+returned to every caller enqueuing the same key while it is queued or
+running (unique partial index on `dedupKey` where `active`), so identical
+requests that overlap wait on one run and store one result. An
+`idempotency_key` also matches finished jobs, for as long as they are
+retained.
+
+Handlers are registered per kind with register(); a handler receives the
+db, the job payload and the job id, and returns the result document. A job
+can run more than once (retries, expired leases), so handlers key their
+writes on the job id to stay idempotent. Handlers report progress with
+publish(); follow() delivers it to callers in the same process.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "4"))
+JOB_LEASE = int(os.getenv("JOB_LEASE", "300"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "86400"))
+MAX_ATTEMPTS = 3
+# Idle workers look for jobs enqueued by other processes this often
+POLL_INTERVAL = 1.0
+# Running jobs renew their lease this often
+HEARTBEAT_INTERVAL = JOB_LEASE / 3
+
+Handler = Callable[[object, dict, str], Awaitable[dict]]
+
+_handlers: Dict[str, Handler] = {}
+# One per worker, all set on every local enqueue so idle workers pick the
+# job up immediately; a worker only clears its own, so none can swallow a
+# wakeup meant for another. Created with the workers, on the serving loop
+_wakeups: List[asyncio.Event] = []
+# job id -> set when a worker in this process finishes the job
+_finished: Dict[str, asyncio.Event] = {}
+# job id -> progress published so far by its run in this process
+_progress: Dict[str, List[Tuple[str, object]]] = {}
+# job id -> queues of the follow() calls waiting on it in this process
+_followers: Dict[str, List[asyncio.Queue]] = {}
+_stats = {"enqueued": 0, "coalesced": 0, "running": 0, "completed": 0, "failed": 0, "retried": 0}
+
+
+def register(kind: str, handler: Handler):
+    _handlers[kind] = handler
+
+
+async def enqueue(
+    db, kind: str, payload: dict, user_id: str = None,
+    dedup_key: str = None, idempotency_key: str = None
+) -> str:
+    """
+    Queue a job on behalf of `user_id` and return its id, or the id of the
+    existing job with the same `dedup_key` (while active) or `idempotency_key`.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"No handler registered for job kind '{kind}'")
+    job = {
+        "kind": kind,
+        "userId": user_id,
+        "payload": payload,
+        "status": "queued",
+        "attempts": 0,
+        "created_at": datetime.now()
+    }
+    if dedup_key:
+        job.update({"dedupKey": dedup_key, "active": True})
+    if idempotency_key:
+        job["idempotencyKey"] = idempotency_key
+
+    while True:
+        try:
+            result = await db.agent_jobs.insert_one(job)
+        except DuplicateKeyError:
+            existing = None
+            if idempotency_key:
+                existing = await db.agent_jobs.find_one({"idempotencyKey": idempotency_key}, {"_id": 1})
+            if existing is None and dedup_key:
+                existing = await db.agent_jobs.find_one({"dedupKey": dedup_key, "active": True}, {"_id": 1})
+            if existing is not None:
+                _stats["coalesced"] += 1
+                return str(existing["_id"])
+            # The other job finished (or expired) in between: enqueue ours
+            job.pop("_id", None)
+            continue
+        _stats["enqueued"] += 1
+        _wake()
+        return str(result.inserted_id)
+
+
+async def backlog(db, user_id: str) -> Tuple[int, int]:
+    """(jobs waiting in the queue, jobs queued or running for `user_id`)."""
+    return await asyncio.gather(
+        db.agent_jobs.count_documents({"status": "queued"}),
+        db.agent_jobs.count_documents({"userId": user_id, "status": {"$in": ["queued", "running"]}})
+    )
+
+
+async def get_job(db, job_id: str) -> Optional[dict]:
+    try:
+        oid = ObjectId(job_id)
+    except InvalidId:
+        return None
+    return await db.agent_jobs.find_one({"_id": oid}, {"payload": 0})
+
+
+async def wait_for(db, job_id: str, timeout: float) -> Optional[dict]:
+    """
+    The job document once it is done or failed, or its current state after
+    `timeout` seconds. Jobs finished in this process are noticed at once;
+    others are polled.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        # Registered before reading, so a finish in between still wakes us
+        event = _finished.setdefault(job_id, asyncio.Event())
+        job = await get_job(db, job_id)
+        remaining = deadline - loop.time()
+        if job is None or job["status"] in ("done", "failed") or remaining <= 0:
+            _finished.pop(job_id, None)
+            return job
+        try:
+            await asyncio.wait_for(event.wait(), min(POLL_INTERVAL, remaining))
+        except asyncio.TimeoutError:
+            pass
+
+
+def publish(job_id: str, event: str, data: object):
+    """Report progress of a running job to its followers in this process."""
+    _progress.setdefault(job_id, []).append((event, data))
+    for queue in _followers.get(job_id, []):
+        queue.put_nowait((event, data))
+
+
+async def follow(db, job_id: str) -> AsyncIterator[Tuple[str, object]]:
+    """
+    (event, data) progress pairs published by the job's run, then
+    ("end", job document or None) once it is done or failed. A run in this
+    process replays what it published before the call; a run in another
+    process only reports its end, which is polled.
+    """
+    queue = asyncio.Queue()
+    for item in _progress.get(job_id, []):
+        queue.put_nowait(item)
+    _followers.setdefault(job_id, []).append(queue)
+    try:
+        while True:
+            job = await get_job(db, job_id)
+            if job is None or job["status"] in ("done", "failed"):
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    if item is not None:
+                        yield item
+                yield "end", job
+                return
+            try:
+                # None: the run in this process ended, look at the document
+                item = await asyncio.wait_for(queue.get(), POLL_INTERVAL)
+                while item is not None:
+                    yield item
+                    item = await asyncio.wait_for(queue.get(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _followers[job_id].remove(queue)
+        if not _followers[job_id]:
+            del _followers[job_id]
+
+
+async def _claim(db) -> Optional[dict]:
+    now = datetime.now()
+    lease = {"$set": {"status": "running", "started_at": now,
+                      "lease_until": now + timedelta(seconds=JOB_LEASE)},
+             "$inc": {"attempts": 1}}
+    job = await db.agent_jobs.find_one_and_update(
+        {"status": "queued"}, lease,
+        sort=[("created_at", 1)], return_document=ReturnDocument.AFTER
+    )
+    if job is None:
+        # Left running by a worker that died
+        job = await db.agent_jobs.find_one_and_update(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": MAX_ATTEMPTS}}, lease,
+            sort=[("created_at", 1)], return_document=ReturnDocument.AFTER
+        )
+    if job is None:
+        # Jobs that took down their worker on every attempt
+        result = await db.agent_jobs.update_many(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "error": f"Worker lost on all {MAX_ATTEMPTS} attempts",
+                      "finished_at": now, "expires_at": now + timedelta(seconds=JOB_RETENTION)},
+             "$unset": {"lease_until": "", "active": ""}}
+        )
+        _stats["failed"] += result.modified_count
+    return job
+
+
+async def _finish(db, job: dict, update: dict):
+    now = datetime.now()
+    update.update({"finished_at": now, "expires_at": now + timedelta(seconds=JOB_RETENTION)})
+    await db.agent_jobs.update_one(
+        {"_id": job["_id"]}, {"$set": update, "$unset": {"lease_until": "", "active": ""}}
+    )
+
+
+async def _heartbeat(db, job_id: ObjectId):
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        try:
+            await db.agent_jobs.update_one(
+                {"_id": job_id, "status": "running"},
+                {"$set": {"lease_until": datetime.now() + timedelta(seconds=JOB_LEASE)}}
+            )
+        except Exception as e:
+            print(f"⚠️ Could not renew lease of job {job_id}: {e}")
+
+
+async def _run(db, job: dict):
+    job_id = str(job["_id"])
+    _stats["running"] += 1
+    _progress[job_id] = []
+    heartbeat = asyncio.create_task(_heartbeat(db, job["_id"]))
+    try:
+        handler = _handlers.get(job["kind"])
+        if handler is None:
+            raise ValueError(f"No handler registered for job kind '{job['kind']}'")
+        result = await handler(db, job["payload"], job_id)
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back instead of waiting out the lease
+        await db.agent_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "queued"}, "$inc": {"attempts": -1}, "$unset": {"lease_until": ""}}
+        )
+        raise
+    except Exception as e:
+        print(f"❌ Job {job_id} ({job['kind']}) failed: {e}")
+        if job["attempts"] < MAX_ATTEMPTS:
+            _stats["retried"] += 1
+            await db.agent_jobs.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": "queued", "error": str(e)}, "$unset": {"lease_until": ""}}
+            )
+            _wake()
+            return
+        _stats["failed"] += 1
+        await _finish(db, job, {"status": "failed", "error": str(e)})
+    else:
+        _stats["completed"] += 1
+        await _finish(db, job, {"status": "done", "result": result})
+    finally:
+        heartbeat.cancel()
+        _stats["running"] -= 1
+        _progress.pop(job_id, None)
+
+    event = _finished.pop(job_id, None)
+    if event is not None:
+        event.set()
+    for queue in _followers.get(job_id, []):
+        queue.put_nowait(None)
+
+
+def _wake():
+    for wakeup in _wakeups:
+        wakeup.set()
+
+
+async def _worker(db, wakeup: asyncio.Event):
+    while True:
+        # Wakeups from before this claim are covered by it
+        wakeup.clear()
+        try:
+            job = await _claim(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Job queue unavailable: {e}")
+            job = None
+
+        if job is None:
+            try:
+                await asyncio.wait_for(wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await _run(db, job)
+
+
+def start_workers(db, count: int = AGENT_WORKERS) -> List[asyncio.Task]:
+    """Worker tasks started from the app lifespan; cancel them on shutdown."""
+    _wakeups[:] = [asyncio.Event() for _ in range(count)]
+    print(f"👷 Starting {count} job worker(s)")
+    return [asyncio.create_task(_worker(db, wakeup)) for wakeup in _wakeups]
+
+
+def job_stats() -> dict:
+    return {"workers": len(_wakeups), **_stats}
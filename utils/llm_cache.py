@@ -0,0 +1,89 @@
+"""
+Cache for model responses that are a pure function of their prompt.
+
+Task recommendations are re-requested often with nothing changed, so the
+ranking call's reply is stored under a hash of the model and the full
+prompt. The prompt already contains everything the reply depends on (the
+goals, and the candidate tasks left after excluding the user's
+assignments), so a change to any of them is a different key and nothing
+needs invalidating.
+
+- In-process front cache (AsyncCache "llm_responses"); concurrent identical
+  requests share one model call.
+- Shared `llm_cache` collection behind it, expired by a TTL index on
+  `expires_at` (see utils/indexes.py).
+
+LLM_CACHE_TTL sets the lifetime in seconds; 0 disables the cache.
+"""
+
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from utils.cache import AsyncCache
+
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+
+response_cache = AsyncCache("llm_responses", maxsize=1024, ttl=min(LLM_CACHE_TTL, 3600))
+
+_stats = {"hits": 0, "mongoHits": 0, "misses": 0, "savedSeconds": 0.0}
+
+
+def cache_key(mode: str, model: str, *prompts: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model, *prompts):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return f"{mode}:{digest.hexdigest()}"
+
+
+async def cached_completion(db, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+    """Reply text for `key`, calling `generate` only if no fresh copy is cached."""
+    if LLM_CACHE_TTL <= 0:
+        return await generate()
+
+    generated = False
+
+    async def load():
+        nonlocal generated
+        now = datetime.now()
+        doc = await db.llm_cache.find_one({"_id": key, "expires_at": {"$gt": now}})
+        if doc:
+            _stats["mongoHits"] += 1
+            return {"text": doc["text"], "latency": doc.get("latency", 0.0)}
+
+        generated = True
+        started = time.perf_counter()
+        text = await generate()
+        latency = time.perf_counter() - started
+        await db.llm_cache.update_one(
+            {"_id": key},
+            {"$set": {
+                "text": text,
+                "latency": latency,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=LLM_CACHE_TTL)
+            }},
+            upsert=True
+        )
+        return {"text": text, "latency": latency}
+
+    entry = await response_cache.get_or_load(key, load)
+    if generated:
+        _stats["misses"] += 1
+    else:
+        _stats["hits"] += 1
+        _stats["savedSeconds"] += entry["latency"]
+        print(f"⚡ LLM cache hit ({entry['latency']:.2f}s saved)")
+    return entry["text"]
+
+
+def llm_cache_stats() -> dict:
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "ttl": LLM_CACHE_TTL,
+        "hitRate": _stats["hits"] / lookups if lookups else 0.0
+    }
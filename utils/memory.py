@@ -0,0 +1,108 @@
+"""
+Bounded conversational memory, one document per user in `chat_memory`:
+
+    {_id: userId, summary: str, turns: [{user, agent, at}], version: int}
+
+After each conversational exchange the turn is appended (record_turn).
+Once more than MEMORY_TURNS + MEMORY_SUMMARY_BATCH turns are stored, the
+oldest ones are folded into the rolling summary by one model call in the
+background. The fold only applies if no other fold happened meanwhile
+(`version`) and removes exactly the turns it summarized, so turns added
+during the call are kept.
+
+load() returns the summary plus as many recent turns as fit in
+MEMORY_TOKEN_BUDGET, so the prompt stays about the same size however long
+the conversation gets, even while a fold is pending or failing.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List
+
+from pymongo import ReturnDocument
+
+MEMORY_TURNS = int(os.getenv("MEMORY_TURNS", "6"))
+MEMORY_SUMMARY_BATCH = int(os.getenv("MEMORY_SUMMARY_BATCH", "4"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))
+
+# Summary text beyond this share of the budget is cut
+SUMMARY_SHARE = 0.4
+
+Summarizer = Callable[[str, List[dict]], Awaitable[str]]
+
+# user id -> fold in progress in this process (also keeps the task referenced)
+_folds: Dict[str, asyncio.Task] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; only used for budgeting
+    return len(text or "") // 4 + 1
+
+
+async def load(db, user_id: str) -> dict:
+    """{"summary": str, "turns": [{user, agent}]}, oldest turn first, within the token budget."""
+    doc = await db.chat_memory.find_one({"_id": user_id}, {"summary": 1, "turns": 1})
+    if not doc:
+        return {"summary": "", "turns": []}
+
+    summary = doc.get("summary", "")
+    budget = MEMORY_TOKEN_BUDGET - estimate_tokens(summary)
+    turns = []
+    for turn in reversed(doc.get("turns", [])):
+        cost = estimate_tokens(turn["user"]) + estimate_tokens(turn["agent"])
+        if cost > budget:
+            break
+        budget -= cost
+        turns.append({"user": turn["user"], "agent": turn["agent"]})
+    turns.reverse()
+    return {"summary": summary, "turns": turns}
+
+
+async def record_turn(db, user_id: str, user_message: str, reply: str, summarize: Summarizer):
+    """Store an exchange; starts a background fold once enough turns piled up."""
+    now = datetime.now()
+    doc = await db.chat_memory.find_one_and_update(
+        {"_id": user_id},
+        {
+            "$push": {"turns": {
+                "$each": [{"user": user_message, "agent": reply, "at": now}],
+                # Hard cap in case folds keep failing
+                "$slice": -4 * (MEMORY_TURNS + MEMORY_SUMMARY_BATCH)
+            }},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"summary": "", "version": 0}
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if len(doc["turns"]) > MEMORY_TURNS + MEMORY_SUMMARY_BATCH and user_id not in _folds:
+        _folds[user_id] = asyncio.create_task(_fold(db, user_id, doc, summarize))
+        _folds[user_id].add_done_callback(lambda _: _folds.pop(user_id, None))
+
+
+async def _fold(db, user_id: str, doc: dict, summarize: Summarizer):
+    folded = doc["turns"][:len(doc["turns"]) - MEMORY_TURNS]
+    try:
+        summary = await summarize(doc.get("summary", ""), folded)
+    except Exception as e:
+        # Turns stay verbatim (load() still bounds them); the next exchange retries
+        print(f"⚠️ Could not summarize conversation for {user_id}: {e}")
+        return
+
+    max_chars = int(MEMORY_TOKEN_BUDGET * SUMMARY_SHARE) * 4
+    summary = summary.strip()[:max_chars]
+    result = await db.chat_memory.update_one(
+        {"_id": user_id, "version": doc["version"]},
+        [{"$set": {
+            "summary": summary,
+            "version": {"$add": ["$version", 1]},
+            "turns": {"$slice": ["$turns", len(folded), {"$max": [{"$size": "$turns"}, 1]}]}
+        }}]
+    )
+    if result.modified_count:
+        print(f"🧠 Folded {len(folded)} turn(s) into the conversation summary for {user_id}")
+
+
+async def clear(db, user_id: str):
+    await db.chat_memory.delete_one({"_id": user_id})
@@ -0,0 +1,50 @@
+"""
+Counts of MongoDB commands issued by this worker, keyed by
+"<command>.<collection>" (e.g. "find.tasks", "insert.projects").
+
+Registered as a pymongo command listener on the app's client and exposed
+through GET /metrics.
+"""
+
+import threading
+from collections import Counter
+
+from pymongo import monitoring
+
+# Commands whose value is the target collection name
+_COLLECTION_COMMANDS = {
+    "find", "insert", "update", "delete", "findAndModify",
+    "aggregate", "count", "distinct", "createIndexes", "listIndexes",
+}
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self._counts = Counter()
+        # Listeners run on Motor's executor threads
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        name = event.command_name
+        if name in _COLLECTION_COMMANDS:
+            target = event.command.get(name)
+        elif name == "getMore":
+            target = event.command.get("collection")
+        else:
+            target = None
+        key = f"{name}.{target}" if isinstance(target, str) else name
+        with self._lock:
+            self._counts[key] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+
+command_counter = CommandCounter()
@@ -0,0 +1,124 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+Pages are opt-in: pass `limit` (and `after` for later pages). The token for
+the next page is returned in the X-Next-Cursor response header so the
+response bodies keep their existing shape. Tokens encode the sort-key values
+of the last document returned, so every page is an indexed range scan no
+matter how deep the client goes.
+"""
+
+import base64
+from typing import List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Query, Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque, URL-safe token for a list of sort-key values (ObjectId/datetime aware)."""
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> list:
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+class PageParams:
+    """Query parameters shared by paginated endpoints; use with Depends()."""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        after: Optional[str] = None
+    ):
+        self.limit = limit if limit is not None or after is None else DEFAULT_PAGE_SIZE
+        try:
+            self.after = decode_cursor(after) if after else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]):
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def _past(field: str, direction: int, value) -> Optional[dict]:
+    """Condition for `field` lying strictly past `value` in sort order (nulls sort first)."""
+    if value is None:
+        return {field: {"$ne": None}} if direction == 1 else None
+    if direction == 1:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort: List[Tuple[str, int]], values: list) -> dict:
+    """
+    Filter selecting documents that sort after `values` for a compound sort,
+    e.g. (a > x) OR (a == x AND b > y).
+    """
+    if len(values) != len(sort):
+        raise ValueError("Cursor does not match sort")
+
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        past = _past(field, direction, values[i])
+        if past is None:
+            continue
+        branch = {f: v for (f, _), v in zip(sort[:i], values[:i])}
+        branches.append({"$and": [branch, past]} if branch else past)
+
+    return {"$or": branches} if branches else {"_id": {"$exists": False}}
+
+
+def page_cursor(
+    collection,
+    query: dict,
+    sort: List[Tuple[str, int]],
+    page: PageParams,
+    projection: Optional[dict] = None,
+):
+    """Unexecuted Motor cursor over the documents after `page.after` (no limit applied)."""
+    if page.after is not None:
+        try:
+            query = {"$and": [query, keyset_filter(sort, page.after)]}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return collection.find(query, projection).sort(sort)
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    sort: List[Tuple[str, int]],
+    page: PageParams,
+    projection: Optional[dict] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Return one page of `collection.find(query)` in `sort` order plus the
+    cursor for the next page (None on the last page). The sort must end in a
+    unique field such as _id. Without a limit every document is returned.
+    """
+    cursor = page_cursor(collection, query, sort, page, projection)
+    if page.limit is None:
+        return [doc async for doc in cursor], None
+
+    docs = await cursor.limit(page.limit + 1).to_list(length=page.limit + 1)
+    if len(docs) <= page.limit:
+        return docs, None
+
+    docs = docs[:page.limit]
+    last = docs[-1]
+    return docs, encode_cursor([last.get(field) for field, _ in sort])
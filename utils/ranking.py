@@ -0,0 +1,96 @@
+"""
+Fractional rank keys for ordering a user's task assignments.
+
+Ranks are base-62 strings compared lexicographically. Appends take the next
+value of a per-user counter in Mongo, so concurrent appends never collide.
+Moves compute a key strictly between the two neighbours, so reordering
+touches exactly one document.
+"""
+
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ReturnDocument
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+SEQUENCE_WIDTH = 6
+# Appended to counter keys so they never end in the zero digit,
+# which the midpoint algorithm requires.
+SEQUENCE_SUFFIX = "V"
+ALLOCATION_CONCURRENCY = 50
+
+
+def rank_for_sequence(sequence: int) -> str:
+    """Fixed-width rank key for a counter value; keys sort in counter order."""
+    digits = []
+    for _ in range(SEQUENCE_WIDTH):
+        sequence, remainder = divmod(sequence, len(DIGITS))
+        digits.append(DIGITS[remainder])
+    if sequence:
+        raise ValueError("Sequence exceeds rank key width")
+    return "".join(reversed(digits)) + SEQUENCE_SUFFIX
+
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """Key between a and b (b=None means unbounded); neither may end in '0'."""
+    if b is not None:
+        n = 0
+        while (a[n] if n < len(a) else DIGITS[0]) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def rank_between(before: Optional[str], after: Optional[str]) -> str:
+    """
+    Return a rank that sorts after `before` and ahead of `after`.
+    Either bound may be None for the start or end of the list.
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"Rank {before!r} must sort before {after!r}")
+    return _midpoint(before or "", after)
+
+
+def ranks_between(before: Optional[str], after: Optional[str], count: int) -> List[str]:
+    """
+    `count` increasing ranks between `before` and `after`, picked by
+    bisection so key length grows with log(count) rather than count.
+    """
+    if count <= 0:
+        return []
+    middle = count // 2
+    rank = rank_between(before, after)
+    return ranks_between(before, rank, middle) + [rank] + ranks_between(rank, after, count - middle - 1)
+
+
+async def allocate_sequence(db, user_id: str, count: int = 1) -> int:
+    """
+    Atomically reserve `count` consecutive sequence values for a user.
+    Returns the last reserved value; the block is [last - count + 1, last].
+    """
+    counter = await db.counters.find_one_and_update(
+        {"_id": f"assignment_rank:{user_id}"},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+
+async def allocate_sequences(db, user_ids: Iterable[str], count: int) -> Dict[str, int]:
+    """Reserve `count` sequence values for each user; returns the last value per user."""
+    semaphore = asyncio.Semaphore(ALLOCATION_CONCURRENCY)
+
+    async def allocate(user_id: str):
+        async with semaphore:
+            return user_id, await allocate_sequence(db, user_id, count)
+
+    return dict(await asyncio.gather(*(allocate(user_id) for user_id in user_ids)))
@@ -0,0 +1,183 @@
+"""
+Throttling for model calls, so one busy user cannot spend the whole Gemini
+quota or slow everyone else down.
+
+- A global token bucket sized to the quota: LLM_RATE_PER_MINUTE tokens per
+  minute, bursts of up to LLM_BURST. With LLM_RATE_LIMIT_BACKEND=mongo the
+  bucket is one document in `rate_limits`, refilled and spent in a single
+  atomic update against the server clock, so every worker shares it. The
+  default, memory, keeps it in process (single-worker deployments).
+- Fair queuing: callers waiting for a token are served round-robin by user,
+  so a user with many calls in flight cannot starve the others.
+- Admission control (admit): requests are refused up front with
+  RateLimited, surfaced as 429 + Retry-After, when the agent job queue
+  already holds LLM_MAX_QUEUE jobs or the user has LLM_USER_MAX_PENDING
+  runs pending.
+
+Call `await limiter.acquire(db, user_id)` right before each model call;
+agent graphs do it per call through RateLimitCallback
+(agents/learning_agent.py).
+"""
+
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from utils import jobs
+
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "60"))
+LLM_BURST = float(os.getenv("LLM_BURST", "10"))
+LLM_RATE_LIMIT_BACKEND = os.getenv("LLM_RATE_LIMIT_BACKEND", "memory")
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "100"))
+LLM_USER_MAX_PENDING = int(os.getenv("LLM_USER_MAX_PENDING", "3"))
+
+
+class RateLimited(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class MemoryBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def take(self, db, cost: float) -> float:
+        """Spend `cost` tokens: 0 if granted, else seconds until they could be."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class MongoBucket:
+    """The bucket as {_id, tokens, updated} in `rate_limits`, shared by all workers."""
+
+    def __init__(self, rate: float, capacity: float, name: str = "gemini"):
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        # Used while Mongo is unreachable, so callers are still paced
+        self.fallback = MemoryBucket(rate, capacity)
+
+    async def take(self, db, cost: float) -> float:
+        elapsed = {"$divide": [{"$subtract": ["$$NOW", {"$ifNull": ["$updated", "$$NOW"]}]}, 1000]}
+        try:
+            bucket = await db.rate_limits.find_one_and_update(
+                {"_id": self.name},
+                [
+                    {"$set": {
+                        "tokens": {"$min": [self.capacity, {"$add": [
+                            {"$ifNull": ["$tokens", self.capacity]},
+                            {"$multiply": [elapsed, self.rate]}
+                        ]}]},
+                        "updated": "$$NOW"
+                    }},
+                    {"$set": {"granted": {"$gte": ["$tokens", cost]}}},
+                    {"$set": {"tokens": {"$cond": [
+                        "$granted", {"$subtract": ["$tokens", cost]}, "$tokens"
+                    ]}}}
+                ],
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            print(f"⚠️ Shared rate limit unavailable, limiting locally: {e}")
+            return await self.fallback.take(db, cost)
+        if bucket["granted"]:
+            return 0.0
+        return (cost - bucket["tokens"]) / self.rate
+
+
+class FairLimiter:
+    """Hands out bucket tokens to waiting callers, one user at a time in turn."""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        # user id -> its waiting (future, cost) pairs; users rotate to the back when served
+        self._waiters: "OrderedDict[str, Deque[Tuple[asyncio.Future, float]]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._stats = {"granted": 0, "rejected": 0, "waitedSeconds": 0.0}
+
+    async def acquire(self, db, user_id: str, cost: float = 1):
+        """Wait for this user's turn and `cost` tokens from the bucket."""
+        cost = min(cost, self.bucket.capacity)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(user_id, deque()).append((future, cost))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch(db))
+
+        started = time.monotonic()
+        await future
+        self._stats["granted"] += 1
+        self._stats["waitedSeconds"] += time.monotonic() - started
+
+    async def _dispatch(self, db):
+        while self._waiters:
+            user_id, queue = next(iter(self._waiters.items()))
+            future, cost = queue[0]
+            if not future.done():
+                wait = await self.bucket.take(db, cost)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                if not future.done():
+                    future.set_result(None)
+            queue.popleft()
+            del self._waiters[user_id]
+            if queue:
+                self._waiters[user_id] = queue
+
+    def record_rejection(self):
+        """Count a run refused by admission control."""
+        self._stats["rejected"] += 1
+
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._waiters.values())
+
+    def stats(self) -> dict:
+        return {
+            "backend": LLM_RATE_LIMIT_BACKEND,
+            "ratePerMinute": LLM_RATE_PER_MINUTE,
+            "burst": LLM_BURST,
+            "waiting": self.waiting(),
+            **self._stats
+        }
+
+
+def _make_bucket():
+    rate = LLM_RATE_PER_MINUTE / 60
+    if LLM_RATE_LIMIT_BACKEND == "mongo":
+        return MongoBucket(rate, LLM_BURST)
+    return MemoryBucket(rate, LLM_BURST)
+
+
+limiter = FairLimiter(_make_bucket())
+
+
+async def admit(db, user_id: str):
+    """Refuse a new agent run up front when the backlog is too deep; raises RateLimited."""
+    queued, user_pending = await jobs.backlog(db, user_id)
+    # Time for the bucket to work through what is already waiting
+    drain = (queued + limiter.waiting() + 1) * 60 / LLM_RATE_PER_MINUTE
+    if user_pending >= LLM_USER_MAX_PENDING:
+        limiter.record_rejection()
+        raise RateLimited(f"You already have {user_pending} requests in progress", drain)
+    if queued >= LLM_MAX_QUEUE:
+        limiter.record_rejection()
+        raise RateLimited("The assistant is busy, please try again shortly", drain)
+
+
+def rate_limit_stats() -> dict:
+    return limiter.stats()
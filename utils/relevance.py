@@ -0,0 +1,173 @@
+"""
+Local goal-to-task relevance ranking (BM25), so the agent only sends the
+best-matching unassigned tasks to the model instead of the whole project.
+
+- One in-memory inverted index per project over task titles and
+  descriptions, built from Mongo on first use. Writes in this worker update
+  it incrementally (index_tasks); task invalidations published by other
+  workers drop it so it is rebuilt on next use.
+- One cached goal profile per user (goal text and its terms), recomputed
+  only after the goals change (invalidate_goals).
+
+Pure Python, no network or model downloads.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils import coherence
+from utils.cache import AsyncCache
+
+RELEVANCE_TOP_K = int(os.getenv("RELEVANCE_TOP_K", "20"))
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from how i in into is it its learn learning
+my of on or that the this to use using want with your
+""".split())
+
+index_cache = AsyncCache("relevance_index", maxsize=64, ttl=3600)
+goal_cache = AsyncCache("goal_profiles", maxsize=4096, ttl=3600)
+
+coherence.register_scope("goals", goal_cache, ["goals:"])
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def _task_terms(task: dict) -> Counter:
+    # Titles carry more signal than descriptions
+    return Counter(tokenize(task.get("title")) * 2 + tokenize(task.get("description")))
+
+
+class ProjectIndex:
+    """BM25 inverted index over one project's tasks."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def upsert(self, task_id: str, terms: Counter):
+        self.remove(task_id)
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[task_id] = tf
+        self.lengths[task_id] = sum(terms.values())
+        self.total_length += self.lengths[task_id]
+
+    def remove(self, task_id: str):
+        length = self.lengths.pop(task_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in [t for t, docs in self.postings.items() if task_id in docs]:
+            del self.postings[term][task_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self.lengths
+
+    def top(self, query: Iterable[str], exclude: Set[str], k: int) -> List[str]:
+        """Task ids by descending BM25 score; unmatched tasks fill the rest in id order."""
+        n = len(self.lengths)
+        avg_length = self.total_length / n if n else 0
+        scores: Dict[str, float] = {}
+        for term in set(query):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for task_id, tf in docs.items():
+                if task_id in exclude:
+                    continue
+                norm = K1 * (1 - B + B * self.lengths[task_id] / avg_length) if avg_length else K1
+                scores[task_id] = scores.get(task_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores, key=lambda task_id: (-scores[task_id], task_id))[:k]
+        if len(ranked) < k:
+            # Without enough matches keep the catalog order (ObjectIds sort by creation)
+            ranked += [
+                task_id for task_id in sorted(self.lengths)
+                if task_id not in exclude and task_id not in scores
+            ][:k - len(ranked)]
+        return ranked
+
+
+async def _get_index(db, project_id: str) -> ProjectIndex:
+    async def load():
+        index = ProjectIndex()
+        async for task in db.tasks.find({"project_id": project_id}, {"title": 1, "description": 1}):
+            index.upsert(str(task["_id"]), _task_terms(task))
+        return index
+
+    return await index_cache.get_or_load(f"index:{project_id}", load)
+
+
+async def top_candidates(
+    db, project_id: str, query_terms: Iterable[str], exclude: Iterable[str] = (), k: int = RELEVANCE_TOP_K
+) -> List[str]:
+    """Ids of the k tasks in `project_id` most relevant to `query_terms`, skipping `exclude`."""
+    index = await _get_index(db, project_id)
+    return index.top(query_terms, set(exclude), k)
+
+
+def index_tasks(tasks: Iterable[dict]):
+    """Apply created or updated task documents (with _id and project_id) to loaded indexes."""
+    for task in tasks:
+        key = f"index:{task['project_id']}"
+        index = index_cache.get(key)
+        if index is None:
+            # Not loaded (or still loading): make sure an in-flight build that
+            # may have missed this task is not stored
+            index_cache.invalidate(key)
+            continue
+        index.upsert(str(task["_id"]), _task_terms(task))
+
+
+def _on_remote_task_change(keys: List[str], prefixes: List[str]):
+    for prefix in prefixes:
+        if prefix.startswith("project_tasks:") and len(prefix) > len("project_tasks:"):
+            project_id = prefix[len("project_tasks:"):].rstrip(":")
+            index_cache.invalidate(f"index:{project_id}")
+        else:
+            # Scope-wide drop
+            index_cache.clear()
+            return
+    task_ids = {key[len("task:"):] for key in keys if key.startswith("task:")}
+    if task_ids:
+        # Rebuild every loaded index holding a changed task
+        stale = [
+            key for key, index in index_cache.items()
+            if any(task_id in index for task_id in task_ids)
+        ]
+        index_cache.invalidate(*stale)
+
+
+coherence.add_listener("tasks", _on_remote_task_change)
+
+
+async def get_goal_profile(db, user_id: str) -> dict:
+    """{"goals": [str], "terms": [str]} for a user, cached until their goals change."""
+    async def load():
+        goals_doc = await db.goals.find_one({"userId": user_id}, {"goals": 1})
+        goals_data = goals_doc.get("goals", []) if goals_doc else []
+        if isinstance(goals_data, str):
+            goals_data = [goals_data]
+        goals = [str(goal).strip() for goal in goals_data if goal and str(goal).strip()]
+        return {"goals": goals, "terms": [t for goal in goals for t in tokenize(goal)]}
+
+    return await goal_cache.get_or_load(f"goals:{user_id}", load)
+
+
+async def invalidate_goals(db, user_id: str):
+    """After a user's goals are set or changed."""
+    await coherence.publish(db, "goals", keys=[f"goals:{user_id}"])
@@ -0,0 +1,172 @@
+"""
+Incrementally maintained progress counters.
+
+- project_stats: {_id: project_id, total, status: {<status>: count}}
+- user_stats:    {_id: user_id, assigned, completed}
+
+Writers bump these with $inc next to the write they describe, so reads are a
+single find_one. The $inc writes never create a counter document: one that
+does not exist yet is built from the source data on first read, so data
+written before counting started is never counted from zero. The counters are not updated in the same transaction as the
+source documents; reconcile_project_stats / reconcile_user_stats recompute
+them from the source data (see reconcile_stats.py) and repair any drift.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+
+from utils.assignment_store import get_assignment_store
+
+RECONCILE_BATCH_SIZE = 1000
+
+
+def _status_key(status: Optional[str]) -> str:
+    # Status values become field names; keep them free of path syntax
+    return (status or "unknown").replace(".", "_").lstrip("$") or "unknown"
+
+
+async def record_tasks_created(db, tasks: Iterable[dict]):
+    """Count newly inserted task documents against their projects."""
+    increments: Dict[str, Counter] = {}
+    for task in tasks:
+        increments.setdefault(task["project_id"], Counter())[_status_key(task.get("status"))] += 1
+
+    operations = [
+        UpdateOne(
+            {"_id": project_id},
+            {"$inc": {"total": sum(counts.values()),
+                      **{f"status.{s}": n for s, n in counts.items()}},
+             "$set": {"touchedAt": datetime.now()}}
+        )
+        for project_id, counts in increments.items()
+    ]
+    if operations:
+        await db.project_stats.bulk_write(operations, ordered=False)
+
+
+async def record_task_status_change(db, project_id: str, old_status: Optional[str], new_status: Optional[str]):
+    old_key, new_key = _status_key(old_status), _status_key(new_status)
+    if old_key == new_key:
+        return
+    await db.project_stats.update_one(
+        {"_id": project_id},
+        {"$inc": {f"status.{old_key}": -1, f"status.{new_key}": 1},
+         "$set": {"touchedAt": datetime.now()}}
+    )
+
+
+async def record_assignment_change(db, user_id: str, assigned: int = 0, completed: int = 0):
+    """Apply a delta to a user's assigned/completed counters."""
+    if not assigned and not completed:
+        return
+    await db.user_stats.update_one(
+        {"_id": user_id},
+        {"$inc": {"assigned": assigned, "completed": completed},
+         "$set": {"touchedAt": datetime.now()}}
+    )
+
+
+async def get_project_stats(db, project_id: str) -> dict:
+    """Counters for one project, built from the tasks on first use."""
+    stats = await db.project_stats.find_one({"_id": project_id})
+    if stats is None:
+        await reconcile_project_stats(db, [project_id])
+        stats = await db.project_stats.find_one({"_id": project_id}) or {}
+    return stats
+
+
+async def get_user_stats(db, user_id: str) -> dict:
+    """Counters for one user, built from the assignments on first use."""
+    stats = await db.user_stats.find_one({"_id": user_id})
+    if stats is None:
+        await reconcile_user_stats(db, [user_id])
+        stats = await db.user_stats.find_one({"_id": user_id}) or {}
+    return stats
+
+
+async def reconcile_project_stats(db, project_ids: Optional[List[str]] = None) -> int:
+    """Recompute project counters from `tasks`; returns how many projects were written."""
+    started = datetime.now()
+    pipeline = [{"$match": {"project_id": {"$in": project_ids}}}] if project_ids is not None else []
+    pipeline += [
+        {"$group": {"_id": {"project": "$project_id", "status": "$status"}, "count": {"$sum": 1}}},
+        {"$group": {"_id": "$_id.project", "statuses": {"$push": {"k": "$_id.status", "v": "$count"}}}},
+    ]
+
+    written = 0
+    seen = set()
+    operations = []
+    async for doc in db.tasks.aggregate(pipeline):
+        statuses = Counter()
+        for entry in doc["statuses"]:
+            statuses[_status_key(entry["k"])] += entry["v"]
+        seen.add(doc["_id"])
+        operations.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"total": sum(statuses.values()), "status": dict(statuses), "reconciledAt": started}},
+            upsert=True
+        ))
+        if len(operations) >= RECONCILE_BATCH_SIZE:
+            await db.project_stats.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+
+    # Projects that no longer have any tasks
+    if project_ids is not None:
+        operations += [
+            UpdateOne({"_id": pid}, {"$set": {"total": 0, "status": {}, "reconciledAt": started}}, upsert=True)
+            for pid in project_ids if pid not in seen
+        ]
+    if operations:
+        await db.project_stats.bulk_write(operations, ordered=False)
+        written += len(operations)
+    if project_ids is None:
+        await db.project_stats.update_many(
+            # Skip counters bumped by a write that raced this run
+            {"reconciledAt": {"$not": {"$gte": started}}, "touchedAt": {"$not": {"$gte": started}}},
+            {"$set": {"total": 0, "status": {}, "reconciledAt": started}}
+        )
+
+    return written
+
+
+async def reconcile_user_stats(db, user_ids: Optional[List[str]] = None) -> int:
+    """Recompute user counters from the assignment store; returns how many users were written."""
+    started = datetime.now()
+    store = get_assignment_store(db)
+
+    written = 0
+    seen = set()
+    operations = []
+    async for doc in store.completion_summary(user_ids):
+        seen.add(doc["userId"])
+        operations.append(UpdateOne(
+            {"_id": doc["userId"]},
+            {"$set": {"assigned": doc["assigned"], "completed": doc["completed"], "reconciledAt": started}},
+            upsert=True
+        ))
+        if len(operations) >= RECONCILE_BATCH_SIZE:
+            await db.user_stats.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+
+    # Users that no longer have any assignments
+    if user_ids is not None:
+        operations += [
+            UpdateOne({"_id": uid}, {"$set": {"assigned": 0, "completed": 0, "reconciledAt": started}}, upsert=True)
+            for uid in user_ids if uid not in seen
+        ]
+    if operations:
+        await db.user_stats.bulk_write(operations, ordered=False)
+        written += len(operations)
+    if user_ids is None:
+        await db.user_stats.update_many(
+            # Skip counters bumped by a write that raced this run
+            {"reconciledAt": {"$not": {"$gte": started}}, "touchedAt": {"$not": {"$gte": started}}},
+            {"$set": {"assigned": 0, "completed": 0, "reconciledAt": started}}
+        )
+
+    return written
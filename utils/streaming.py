@@ -0,0 +1,82 @@
+"""
+Streamed list responses, encoded straight from a Motor cursor.
+
+Opt in with `?stream=ndjson` (one JSON document per line) or
+`?stream=array` (a regular JSON array sent in chunks). Documents are read
+STREAM_BATCH_SIZE at a time and each batch is encoded and flushed before
+the next is fetched, so memory is bounded by the batch rather than the
+result size and the first bytes go out after the first batch.
+
+Streams honour `after` and `limit` but cannot return X-Next-Cursor, since
+headers are sent before the last document is known.
+"""
+
+from typing import AsyncIterator, Callable, Literal, Optional
+
+from fastapi.responses import StreamingResponse
+
+from utils.helpers import serialize
+from utils.pagination import PageParams
+from utils.responses import dumps
+
+StreamFormat = Literal["ndjson", "array"]
+
+STREAM_BATCH_SIZE = 500
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "array": "application/json",
+}
+
+
+async def _batches(cursor, transform: Callable[[dict], dict]) -> AsyncIterator[list]:
+    batch = []
+    async for doc in cursor:
+        batch.append(dumps(transform(doc)))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _ndjson(cursor, transform, head: Optional[dict]) -> AsyncIterator[bytes]:
+    if head is not None:
+        yield dumps(head) + b"\n"
+    async for batch in _batches(cursor, transform):
+        yield b"\n".join(batch) + b"\n"
+
+
+async def _array(cursor, transform, head: Optional[dict], field: Optional[str]) -> AsyncIterator[bytes]:
+    if head is not None:
+        # {...head fields, "<field>": [ ...streamed documents... ]}
+        opening = dumps({**{k: v for k, v in head.items() if k != field}, field: []})
+        yield opening[:-2]  # drop the closing ]}
+    else:
+        yield b"["
+    first = True
+    async for batch in _batches(cursor, transform):
+        yield (b"" if first else b",") + b",".join(batch)
+        first = False
+    yield b"]}" if head is not None else b"]"
+
+
+def stream_cursor(
+    cursor,
+    fmt: StreamFormat,
+    page: Optional[PageParams] = None,
+    transform: Callable[[dict], dict] = serialize,
+    head: Optional[dict] = None,
+    field: str = "items",
+) -> StreamingResponse:
+    """
+    Stream `cursor` as NDJSON or a JSON array. With `head`, the array form is
+    the head object with the documents nested under `field`, and the NDJSON
+    form sends `head` as the first line.
+    """
+    cursor = cursor.batch_size(STREAM_BATCH_SIZE)
+    if page is not None and page.limit is not None:
+        cursor = cursor.limit(page.limit)
+
+    body = _ndjson(cursor, transform, head) if fmt == "ndjson" else _array(cursor, transform, head, field)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt])
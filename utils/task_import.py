@@ -0,0 +1,141 @@
+"""
+Streaming bulk import of tasks from NDJSON or CSV.
+
+Rows are parsed and validated against the Task model one at a time and
+written with insert_many(ordered=False) in fixed-size batches, so memory use
+is bounded by the batch size rather than the upload size.
+"""
+
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from models import Task
+from utils.stats import record_tasks_created
+from utils.catalog import invalidate_tasks
+from utils.relevance import index_tasks
+
+FORMATS = ("ndjson", "csv")
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+
+async def _iter_ndjson(chunks) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    row = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Row must be a JSON object"
+            continue
+        yield row, data, None
+
+
+async def _iter_csv(chunks) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    header = None
+    row = 0
+    record = ""
+    async for line in _iter_lines(chunks):
+        # A quoted field may contain newlines; keep reading until quotes balance
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        fields = next(csv.reader([record]), [])
+        record = ""
+        if not any(field.strip() for field in fields):
+            continue
+        if header is None:
+            header = [field.strip() for field in fields]
+            continue
+        row += 1
+        if len(fields) != len(header):
+            yield row, None, f"Expected {len(header)} columns, got {len(fields)}"
+            continue
+        # Empty cells mean "use the model default"
+        yield row, {k: v for k, v in zip(header, fields) if v != ""}, None
+    if record:
+        yield row + 1, None, "Unterminated quoted field"
+
+
+async def import_tasks(
+    db,
+    chunks: AsyncIterator[bytes],
+    fmt: str = "ndjson",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> dict:
+    """
+    Validate and insert tasks from a byte stream.
+    Returns inserted/failed counts and the first MAX_REPORTED_ERRORS row errors.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    rows = _iter_ndjson(chunks) if fmt == "ndjson" else _iter_csv(chunks)
+    summary = {"inserted": 0, "failed": 0, "errors": []}
+
+    def record_error(row: int, error: str):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"row": row, "error": error})
+
+    async def flush(batch: List[Tuple[int, dict]]):
+        failed_indexes = set()
+        try:
+            result = await db.tasks.insert_many([doc for _, doc in batch], ordered=False)
+            summary["inserted"] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            summary["inserted"] += e.details.get("nInserted", 0)
+            for error in write_errors:
+                failed_indexes.add(error["index"])
+                record_error(batch[error["index"]][0], error.get("errmsg", "Write failed"))
+        inserted = [doc for i, (_, doc) in enumerate(batch) if i not in failed_indexes]
+        await record_tasks_created(db, inserted)
+        await invalidate_tasks(db, project_ids=[doc["project_id"] for doc in inserted])
+        index_tasks(inserted)
+
+    batch = []
+    async for row, data, error in rows:
+        if error:
+            record_error(row, error)
+            continue
+        try:
+            task = Task.model_validate(data)
+        except ValidationError as e:
+            record_error(row, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+
+        batch.append((row, task.model_dump(exclude={"id"})))
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+
+    if batch:
+        await flush(batch)
+
+    return summary
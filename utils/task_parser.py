@@ -0,0 +1,94 @@
+"""
+Extraction of suggested tasks from an agent reply.
+
+The reply is a numbered list ("1. Title" or "1) Title"), one task per line.
+TaskStreamParser consumes the reply chunk by chunk as it is streamed and
+returns each task as soon as its line is complete, in one pass with
+precompiled patterns. parse_tasks runs the same parser over a full reply.
+
+A reply only counts as a task list once it has MIN_TASK_LINES lines
+starting with a digit, so conversational answers with a short numbered
+aside produce no tasks. Tasks seen before that point are held back and
+released together.
+"""
+
+import re
+from typing import Dict, List
+
+_NUMBERED_LINE = re.compile(r"(\d+)[.)]\s*(.+)")
+_INLINE_ITEM = re.compile(r"\d+[.)]\s*")
+
+MIN_TASK_LINES = 3
+
+
+def _task(number: str, name: str) -> Dict:
+    return {
+        "taskId": f"suggested_task_{number}",
+        "name": name,
+        "isSuggested": True  # Flag to indicate this is an AI-suggested task
+    }
+
+
+class TaskStreamParser:
+    def __init__(self):
+        self.tasks: List[Dict] = []
+        self._numbered_lines = 0
+        self._released = 0
+        self._partial: List[str] = []
+        self._chunks: List[str] = []
+
+    @property
+    def is_task_list(self) -> bool:
+        return self._numbered_lines >= MIN_TASK_LINES
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk; returns the tasks whose lines it completed."""
+        self._chunks.append(chunk)
+        if "\n" not in chunk:
+            self._partial.append(chunk)
+            return []
+
+        first, *lines = chunk.split("\n")
+        self._partial.append(first)
+        self._line("".join(self._partial))
+        for line in lines[:-1]:
+            self._line(line)
+        self._partial = [lines[-1]]
+        return self._release()
+
+    def close(self) -> List[Dict]:
+        """Finish the reply; returns any tasks not yet released."""
+        self._line("".join(self._partial))
+        self._partial = []
+        if self.is_task_list and not self.tasks:
+            # Items on one line: "1. First 2. Second 3. Third"
+            parts = _INLINE_ITEM.split("".join(self._chunks))
+            self.tasks = [
+                _task(str(i), part.strip())
+                for i, part in enumerate(parts[1:], 1) if part.strip()
+            ]
+        return self._release()
+
+    def _line(self, line: str):
+        line = line.strip()
+        if not line or not line[0].isdigit():
+            return
+        self._numbered_lines += 1
+        match = _NUMBERED_LINE.fullmatch(line)
+        if match:
+            self.tasks.append(_task(match.group(1), match.group(2).strip()))
+
+    def _release(self) -> List[Dict]:
+        if not self.is_task_list:
+            return []
+        released = self.tasks[self._released:]
+        self._released = len(self.tasks)
+        return released
+
+
+def parse_tasks(text: str) -> List[Dict]:
+    """Tasks in a complete reply, or [] if it is not a task list."""
+    parser = TaskStreamParser()
+    parser.feed(text)
+    parser.close()
+    return parser.tasks if parser.is_task_list else []